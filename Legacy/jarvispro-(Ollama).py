@@ -6,9 +6,54 @@ import random
 import subprocess
 import webbrowser
 import requests
+import json
+import re
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 from threading import Thread
 
+def create_http_session(pool_size=4, retries=2):
+    """Keep-alive session so repeated calls reuse pooled connections"""
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=0.3, status_forcelist=(502, 503, 504),
+                  allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+class CircuitBreaker:
+    """Opens after repeated failures, then lets one probe through after a cool-down"""
+
+    def __init__(self, failure_threshold=3, window=60, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = []
+        self.opened_at = 0
+
+    def allow(self):
+        if self.state == "open" and time.time() - self.opened_at >= self.reset_timeout:
+            self.state = "half-open"
+        return self.state != "open"
+
+    def record_success(self):
+        self.failures = []
+        self.state = "closed"
+
+    def record_failure(self):
+        now = time.time()
+        self.failures = [t for t in self.failures if now - t < self.window] + [now]
+        if self.state == "half-open" or len(self.failures) >= self.failure_threshold:
+            self.trip()
+
+    def trip(self):
+        self.state = "open"
+        self.opened_at = time.time()
+        self.failures = []
+
 # Ollama version of code (legacy)
 class JARVIS:
     def __init__(self, root):
@@ -32,14 +77,19 @@ class JARVIS:
         """AI configuration with failover"""
         self.ollama_url = "http://localhost:11434/api/generate"
         self.current_model = "llama3"
-        self.ai_enabled = self.test_ollama_connection()
+        self.keep_alive = "30m"  # keep the model resident between commands instead of reloading it
+        self.http = create_http_session()
+        self.breaker = CircuitBreaker()
+        if not self.test_ollama_connection():
+            self.breaker.trip()
 
     def test_ollama_connection(self):
         """Check if Ollama is running"""
         try:
-            test = requests.post(
+            test = self.http.post(
                 self.ollama_url,
-                json={"model": self.current_model, "prompt": "test", "stream": False},
+                json={"model": self.current_model, "prompt": "test", "stream": False,
+                      "keep_alive": self.keep_alive},
                 timeout=3
             )
             return test.status_code == 200
@@ -309,35 +359,81 @@ class JARVIS:
         self.jarvis_speak(random.choice(jokes))
 
     # ================= ENHANCED AI INTEGRATION =================
-    def query_ollama(self, prompt):
-        """Improved AI responses with better context"""
-        if not self.ai_enabled:
-            return self._offline_response(prompt)
+    def stream_ollama(self, prompt):
+        """Yield response text from Ollama's newline-delimited JSON stream"""
+        with self.http.post(
+            self.ollama_url,
+            json={
+                "model": self.current_model,
+                "prompt": (
+                    f"Respond as JARVIS from Iron Man to {self.user_name}. "
+                    f"Be concise, accurate, and slightly witty. "
+                    f"Question: {prompt}\n"
+                    "Response style examples:\n"
+                    "- 'According to my databases, Sir...'\n"
+                    "- 'My analysis indicates...'\n"
+                    "- 'The answer to your query is...'"
+                ),
+                "stream": True,
+                "keep_alive": self.keep_alive,
+                "options": {"temperature": 0.7}
+            },
+            stream=True,
+            timeout=(3.05, 15)  # read timeout applies between chunks, not to the whole answer
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(chunk_size=None):
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise Exception(data["error"])
+                if data.get("response"):
+                    yield data["response"]
+                if data.get("done"):
+                    break
+
+    def stream_response(self, prompt):
+        """Show the answer as it streams in and speak each finished sentence"""
+        if not self.breaker.allow():
+            self.jarvis_speak(self._offline_response(prompt))
+            return
             
+        self._append_chat("JARVIS: ", 'jarvis')
+        pending = ""
+        received = False
         try:
-            response = requests.post(
-                self.ollama_url,
-                json={
-                    "model": self.current_model,
-                    "prompt": (
-                        f"Respond as JARVIS from Iron Man to {self.user_name}. "
-                        f"Be concise, accurate, and slightly witty. "
-                        f"Question: {prompt}\n"
-                        "Response style examples:\n"
-                        "- 'According to my databases, Sir...'\n"
-                        "- 'My analysis indicates...'\n"
-                        "- 'The answer to your query is...'"
-                    ),
-                    "stream": False,
-                    "options": {"temperature": 0.7}
-                },
-                timeout=15
-            )
-            return response.json().get("response", "Processing... one moment, Sir.")
+            for chunk in self.stream_ollama(prompt):
+                if not received:
+                    self.breaker.record_success()
+                received = True
+                self._append_chat(chunk, 'jarvis')
+                sentences = re.split(r'(?<=[.!?])\s+', pending + chunk)
+                pending = sentences.pop()
+                for sentence in sentences:
+                    self._say(sentence)
         except Exception as e:
             print(f"AI Error: {e}")
-            self.ai_enabled = False
-            return self._offline_response(prompt)
+            # A stream that already delivered text keeps it; only a silent failure falls back
+            if not received:
+                self.breaker.record_failure()
+                pending = self._offline_response(prompt)
+                self._append_chat(pending, 'jarvis')
+        self._append_chat("\n\n", 'jarvis')
+        self._say(pending)
+
+    def _append_chat(self, text, tag):
+        """Append streamed text to the chat without a speaker prefix"""
+        self.chat_area.configure(state='normal')
+        self.chat_area.insert(tk.END, text, tag)
+        self.chat_area.configure(state='disabled')
+        self.chat_area.see(tk.END)
+        self.root.update_idletasks()
+
+    def _say(self, text):
+        if text.strip():
+            self.engine.say(text.strip())
+            self.engine.runAndWait()
 
     def _offline_response(self, prompt):
         """Better fallback responses"""
@@ -394,8 +490,7 @@ class JARVIS:
                 return
                 
         # AI fallback
-        response = self.query_ollama(command)
-        self.jarvis_speak(response)
+        self.stream_response(command)
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,101 @@
+"""Generate synthetic wake-word fixtures for --bench-wake
+
+Writes templates/, positive/ and negative/ WAV clips (16 kHz mono) into the
+output directory. "Jarvis" is approximated by a fixed sequence of voiced
+formant segments and band-limited fricatives, spoken at varying speed and
+pitch; negatives are other segment sequences and bursts of noise. The seed
+is fixed, so the same clips are produced on every run.
+
+Usage:
+    python fixtures/wake/generate.py [OUTPUT_DIR]   (default: wake_fixtures)
+    python "jarvis_v10w&l.py" --bench-wake OUTPUT_DIR
+"""
+import os
+import sys
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+# (kind, formants or band, seconds): 'v' voiced segment, 'f' fricative noise band
+JARVIS = [('f', 1500, 4000, 0.06), ('v', (700, 1200), 0.15), ('v', (500, 1500), 0.08),
+          ('f', 2000, 6000, 0.05), ('v', (300, 2300), 0.14), ('f', 4000, 8000, 0.12)]
+OTHER_WORDS = [
+    [('v', (300, 900), 0.2), ('f', 3000, 7000, 0.1), ('v', (600, 1000), 0.2)],
+    [('f', 200, 1200, 0.08), ('v', (400, 2000), 0.25), ('v', (250, 2500), 0.1)],
+    [('v', (700, 1100), 0.3), ('v', (300, 800), 0.3)],
+]
+
+
+def voiced(f0, formants, duration):
+    t = np.arange(int(SAMPLE_RATE * duration)) / SAMPLE_RATE
+    signal = np.zeros_like(t)
+    for harmonic in range(1, 30):
+        frequency = f0 * harmonic
+        if frequency > 7000:
+            break
+        amplitude = sum(np.exp(-((frequency - formant) / 120) ** 2) for formant in formants) + 0.02
+        signal += amplitude * np.sin(2 * np.pi * frequency * t)
+    return signal * np.hanning(len(t))
+
+
+def fricative(rng, duration, low, high):
+    noise = rng.standard_normal(int(SAMPLE_RATE * duration))
+    spectrum = np.fft.rfft(noise)
+    frequencies = np.fft.rfftfreq(len(noise), 1 / SAMPLE_RATE)
+    spectrum[(frequencies < low) | (frequencies > high)] = 0
+    return np.fft.irfft(spectrum, len(noise)) * np.hanning(len(noise)) * 0.5
+
+
+def word(rng, segments, speed, f0):
+    parts = []
+    for kind, *args in segments:
+        duration = args[-1] / speed
+        parts.append(voiced(f0, args[0], duration) if kind == 'v' else fricative(rng, duration, args[0], args[1]))
+    return np.concatenate(parts)
+
+
+def silence(seconds):
+    return np.zeros(int(SAMPLE_RATE * seconds))
+
+
+def save(rng, path, signal):
+    signal = signal / np.max(np.abs(signal)) * 0.6 + rng.standard_normal(len(signal)) * 0.01
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes((np.clip(signal, -1, 1) * 32767).astype(np.int16).tobytes())
+
+
+def generate(output_dir, templates=4, positives=20, negatives=30, seed=0):
+    rng = np.random.default_rng(seed)
+    for label in ('templates', 'positive', 'negative'):
+        os.makedirs(os.path.join(output_dir, label), exist_ok=True)
+
+    for i in range(templates):
+        save(rng, os.path.join(output_dir, 'templates', f"t{i}.wav"), np.concatenate([
+            silence(0.1), word(rng, JARVIS, rng.uniform(0.85, 1.15), rng.uniform(100, 180)), silence(0.1)]))
+
+    # Half of the positives say only the wake word, half follow it with a command
+    for i in range(positives):
+        tail = word(rng, OTHER_WORDS[i % 3], 1, 120) if i % 2 else silence(0.05)
+        save(rng, os.path.join(output_dir, 'positive', f"p{i}.wav"), np.concatenate([
+            silence(rng.uniform(0.1, 0.5)), word(rng, JARVIS, rng.uniform(0.75, 1.25), rng.uniform(90, 200)),
+            silence(0.1), tail]))
+
+    # Every fifth negative is a burst of broadband noise, the rest other speech
+    for i in range(negatives):
+        if i % 5:
+            signal = np.concatenate([silence(0.2), word(rng, OTHER_WORDS[i % 3], rng.uniform(0.8, 1.2),
+                                                        rng.uniform(90, 200)),
+                                     word(rng, OTHER_WORDS[(i + 1) % 3], 1, 130)])
+        else:
+            signal = rng.standard_normal(SAMPLE_RATE) * 0.3
+        save(rng, os.path.join(output_dir, 'negative', f"n{i}.wav"), signal)
+    print(f"Wrote {templates} templates, {positives} positive and {negatives} negative clips to {output_dir}")
+
+
+if __name__ == "__main__":
+    generate(sys.argv[1] if len(sys.argv) > 1 else 'wake_fixtures')
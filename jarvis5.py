@@ -13,6 +13,8 @@ import platform
 import threading
 import queue
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import speech_recognition as sr
 import wikipedia
@@ -23,6 +25,7 @@ import psutil
 from PIL import Image, ImageTk
 import sys
 import logging
+import importlib.util
 
 # Configure logging
 logging.basicConfig(
@@ -32,6 +35,16 @@ logging.basicConfig(
     filemode='a'
 )
 
+def create_http_session(pool_size=4, retries=2):
+    """Keep-alive session so repeated calls reuse pooled connections"""
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=0.3, status_forcelist=(502, 503, 504),
+                  allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
 class JARVIS:
     def __init__(self, root):
         self.root = root
@@ -42,7 +55,10 @@ class JARVIS:
         self.voice_active = False
         self.recognizer = sr.Recognizer()
         self.microphone = sr.Microphone()
+        self.stt_backend = os.getenv('JARVIS_STT_BACKEND', 'google')
+        self.last_stt = None  # (backend, seconds) of the last recognition
         self.weather_api_key = os.getenv('WEATHER_API_KEY')
+        self.http = create_http_session()
         self.wolfram_app_id = os.getenv('WOLFRAM_APP_ID')
         self.current_theme = 'dark'
         
@@ -375,6 +391,8 @@ class JARVIS:
         """Update the status bar with current system status"""
         ai_status = "Online" if self.ai_enabled else "Offline"
         voice_status = "On" if self.voice_active else "Off"
+        if self.last_stt:
+            voice_status += f" ({self.last_stt[0]} {self.last_stt[1] * 1000:.0f} ms)"
         self.status_bar.config(
             text=f"System: Ready | AI: {ai_status} | Voice: {voice_status} | CPU: {psutil.cpu_percent()}% | RAM: {psutil.virtual_memory().percent}%"
         )
@@ -490,7 +508,7 @@ class JARVIS:
                     audio = self.recognizer.listen(source, timeout=5, phrase_time_limit=10)
                 
                 try:
-                    command = self.recognizer.recognize_google(audio)
+                    command = self.recognize_speech(audio)
                     self.update_chat("YOU", command, 'user')
                     self.command_queue.put(command)
                 except sr.UnknownValueError:
@@ -506,6 +524,24 @@ class JARVIS:
                 self.update_status_bar()
                 self.jarvis_speak("Voice recognition error. Switching to manual mode.")
 
+    def recognize_speech(self, audio):
+        """Recognize with Google, or the local PocketSphinx engine when offline or configured"""
+        local_available = importlib.util.find_spec('pocketsphinx') is not None
+        if self.stt_backend != 'local':
+            start = time.perf_counter()
+            try:
+                command = self.recognizer.recognize_google(audio)
+                self.last_stt = ("Google", time.perf_counter() - start)
+                return command
+            except sr.RequestError as e:
+                if not local_available:
+                    raise
+                logging.warning(f"Google speech recognition unavailable ({e}); using local engine")
+        start = time.perf_counter()
+        command = self.recognizer.recognize_sphinx(audio)
+        self.last_stt = ("Local", time.perf_counter() - start)
+        return command
+
     # Command handlers
     def get_current_time(self, _=None):
         """Return the current time"""
@@ -527,7 +563,7 @@ class JARVIS:
             base_url = "http://api.openweathermap.org/data/2.5/weather?"
             complete_url = f"{base_url}q={location}&appid={self.weather_api_key}&units=metric"
             
-            response = requests.get(complete_url)
+            response = self.http.get(complete_url, timeout=10)
             data = response.json()
             
             if data["cod"] != "404":
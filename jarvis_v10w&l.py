@@ -1,897 +1,4352 @@
-import tkinter as tk
-from tkinter import scrolledtext, font, messagebox, ttk
-import pyttsx3
-import datetime
-import random
-import subprocess
-import webbrowser
-import time
-import google.generativeai as genai
-from dotenv import load_dotenv
-import os
-import platform
-import psutil
-import socket
-import traceback
-import speech_recognition as sr
-import logging
-import threading
-import json
-import queue
-from PIL import Image, ImageTk
-import urllib.parse
-import sys
-import shutil
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filename='jarvis.log',
-    filemode='a'
-)
-
-class JARVIS:
-    def __init__(self, root):
-        try:
-            self.root = root
-            self.user_name = "Sir"  # Default name
-            self.system_os = platform.system().lower()
-            self.running = True
-            self.command_queue = queue.Queue()
-            self.voice_active = False
-            self.is_speaking = False
-            self.weather_api_key = os.getenv('WEATHER_API_KEY')
-            self.wolfram_app_id = os.getenv('WOLFRAM_APP_ID')
-            self.current_theme = 'dark'
-            
-            # Initialize voice recognition with error handling
-            try:
-                self.recognizer = sr.Recognizer()
-                self.microphone = sr.Microphone()
-                # Test microphone immediately
-                with self.microphone as source:
-                    self.recognizer.adjust_for_ambient_noise(source, duration=1)
-                logging.info("Microphone initialized successfully")
-            except Exception as e:
-                logging.error(f"Microphone initialization failed: {e}")
-                messagebox.showwarning("Microphone Error", 
-                                    "Could not initialize microphone. Voice control will be disabled.")
-                self.microphone = None
-                self.voice_active = False
-
-            # Initialize user memory system
-            self.user_memory = {
-                'personal_info': {},  # For storing personal information
-                'custom_lists': {},   # For user-created lists
-                'custom_dicts': {}     # For user-created dictionaries
-            }
-            
-            # Try to load saved memory
-            self.load_memory()
-
-            # Initialize components
-            self.configure_window()
-            self.setup_gemini()
-            self.create_gui()
-            self.setup_voice()
-            self.setup_responses()
-            self.setup_applications()
-            self.boot_sequence()
-            
-        except Exception as e:
-            messagebox.showerror("Initialization Error", f"Failed to initialize JARVIS:\n{str(e)}")
-            traceback.print_exc()
-            self.root.destroy()
-
-    def configure_window(self):
-        """Configure main window appearance with modern UI"""
-        self.root.title("J.A.R.V.I.S. - Just A Rather Very Intelligent System")
-        self.root.geometry("1000x700")
-        self.root.minsize(800, 600)
-        self.root.configure(bg='#0a0a0a')
-        
-        # Modern styling
-        self.style = ttk.Style()
-        self.style.theme_use('clam')
-        self.style.configure('TFrame', background='#0a0a0a')
-        self.style.configure('TLabel', background='#0a0a0a', foreground='#ff6600')
-        self.style.configure('TButton', background='#ff6600', foreground='black')
-        self.style.map('TButton', 
-                      background=[('active', '#ff8533'), ('pressed', '#cc5200')])
-
-    def setup_gemini(self):
-        """Initialize Gemini AI with robust error handling"""
-        try:
-            load_dotenv()
-            api_key = os.getenv('GEMINI_API_KEY')
-            
-            if not api_key:
-                logging.warning("Gemini API key not found in .env file")
-                self.ai_enabled = False
-                return
-                
-            genai.configure(api_key=api_key)
-            
-            # Try multiple model versions
-            model_versions = ['gemini-1.5-flash', 'gemini-1.0-pro', 'gemini-pro']
-            self.model = None
-            
-            for version in model_versions:
-                try:
-                    self.model = genai.GenerativeModel(version)
-                    break
-                except Exception as e:
-                    logging.warning(f"Failed to initialize {version}: {e}")
-                    continue
-            
-            if not self.model:
-                raise Exception("No compatible Gemini model found")
-            
-            # Test connection
-            try:
-                test_query = self.model.generate_content("Test connection")
-                if test_query.text:
-                    self.ai_enabled = True
-                    logging.info("Gemini AI connected successfully")
-                else:
-                    raise Exception("Empty response from Gemini")
-            except Exception as e:
-                logging.error(f"Gemini test failed: {e}")
-                self.ai_enabled = False
-                
-        except Exception as e:
-            logging.error(f"Gemini setup error: {e}")
-            self.ai_enabled = False
-
-    def setup_applications(self):
-        """Configure applications JARVIS can launch with cross-platform support"""
-        self.applications = {
-            "calculator": {
-                "windows": "calc.exe",
-                "linux": "gnome-calculator" if self.check_command_exists("gnome-calculator") else "kcalc",
-                "mac": "Calculator"
-            },
-            "notepad": {
-                "windows": "notepad.exe",
-                "linux": "gedit" if self.check_command_exists("gedit") else "nano",
-                "mac": "TextEdit"
-            },
-            "browser": {
-                "windows": "start chrome",
-                "linux": "xdg-open https://www.google.com",
-                "mac": "open -a Safari"
-            },
-            "spotify": {
-                "windows": "spotify",
-                "linux": "spotify" if self.check_command_exists("spotify") else "xdg-open https://open.spotify.com",
-                "mac": "open -a Spotify"
-            },
-            "terminal": {
-                "windows": "cmd.exe",
-                "linux": "gnome-terminal" if self.check_command_exists("gnome-terminal") else "x-terminal-emulator",
-                "mac": "Terminal"
-            },
-            "file explorer": {
-                "windows": "explorer",
-                "linux": "nautilus" if self.check_command_exists("nautilus") else "xdg-open .",
-                "mac": "open ."
-            }
-        }
-
-    def check_command_exists(self, cmd):
-        """Check if a command exists on Linux systems"""
-        if self.system_os != 'linux':
-            return False
-        return shutil.which(cmd) is not None
-
-    def create_gui(self):
-        """Create modern interface components"""
-        # Main frame
-        main_frame = ttk.Frame(self.root)
-        main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        # Chat display with modern styling
-        self.chat_area = scrolledtext.ScrolledText(
-            main_frame,
-            wrap=tk.WORD,
-            state='disabled',
-            font=('Consolas', 12),
-            bg='#1a1a1a',
-            fg='#ff6600',
-            insertbackground='white',
-            borderwidth=0,
-            highlightthickness=0,
-            padx=20,
-            pady=20
-        )
-        self.chat_area.pack(fill=tk.BOTH, expand=True)
-        
-        # Configure tags for different message types
-        self.chat_area.tag_config('user', foreground='#00ff00')
-        self.chat_area.tag_config('system', foreground='#ffffff')
-        self.chat_area.tag_config('warning', foreground='#ffff00')
-        self.chat_area.tag_config('error', foreground='#ff0000')
-        self.chat_area.tag_config('jarvis', foreground='#ff6600')
-
-        # Status bar
-        self.status_bar = ttk.Label(
-            main_frame,
-            text=f"System: Ready | OS: {platform.system()} | AI: {'Online' if self.ai_enabled else 'Offline'} | Voice: Off",
-            relief=tk.SUNKEN,
-            anchor=tk.W
-        )
-        self.status_bar.pack(fill=tk.X, pady=(0, 5))
-
-        # Input frame with modern controls
-        input_frame = ttk.Frame(main_frame)
-        input_frame.pack(fill=tk.X, padx=20, pady=(0, 20))
-        
-        # Voice control button
-        self.voice_btn = ttk.Button(
-            input_frame,
-            text="🎤",
-            command=self.toggle_voice_control,
-            width=3
-        )
-        self.voice_btn.pack(side=tk.LEFT, padx=(0, 10))
-        
-        self.user_input = ttk.Entry(
-            input_frame,
-            font=('Helvetica', 12)
-        )
-        self.user_input.pack(side=tk.LEFT, fill=tk.X, expand=True, ipady=5)
-        self.user_input.bind('<Return>', self.process_input)
-        
-        ttk.Button(
-            input_frame,
-            text="SEND",
-            command=self.process_input,
-            style='Accent.TButton'
-        ).pack(side=tk.RIGHT, padx=(10, 0))
-
-    def setup_voice(self):
-        """Configure text-to-speech with British accent"""
-        try:
-            self.engine = pyttsx3.init()
-            voices = self.engine.getProperty('voices')
-            
-            # Try to find a British male voice
-            preferred_voices = {
-                'windows': 'HKEY_LOCAL_MACHINE\\SOFTWARE\\Microsoft\\Speech\\Voices\\Tokens\\TTS_MS_EN-GB_DAVID_11.0',
-                'linux': 'english_rp',
-                'mac': 'com.apple.speech.synthesis.voice.daniel'
-            }
-            
-            # Set voice based on OS
-            if self.system_os in preferred_voices:
-                try:
-                    self.engine.setProperty('voice', preferred_voices[self.system_os])
-                except:
-                    # Fallback to any English male voice
-                    for voice in voices:
-                        if "english" in voice.languages and "male" in voice.name.lower():
-                            self.engine.setProperty('voice', voice.id)
-                            break
-            
-            self.engine.setProperty('rate', 170)
-            self.engine.setProperty('volume', 0.95)
-            logging.info("Voice engine initialized successfully")
-        except Exception as e:
-            logging.error(f"Voice setup error: {e}")
-            self.engine = None
-
-    def setup_responses(self):
-        """Set up default responses with formal language"""
-        hour = datetime.datetime.now().hour
-        time_of_day = "morning" if 5 <= hour < 12 else "afternoon" if 12 <= hour < 17 else "evening"
-        
-        self.responses = {
-            "greeting": [
-                f"Systems online. Good {time_of_day} {self.user_name}. How may I assist you today?",
-                f"All systems operational. Good {time_of_day} {self.user_name}. Ready for your commands.",
-                f"Initialization complete. Good {time_of_day} {self.user_name}. How can I be of service?"
-            ],
-            "farewell": [
-                "Shutting down systems. Goodbye Sir.",
-                "Powering off. Until next time Sir.",
-                "Terminating session. It's been a pleasure serving you."
-            ],
-            "gratitude": [
-                "You're most welcome Sir. Always at your service.",
-                "My pleasure, as always Sir.",
-                "Gratitude acknowledged. Happy to assist."
-            ],
-            "apology": [
-                "No need to apologize Sir. How may I assist you?",
-                "All is forgiven Sir. What can I do for you?",
-                "No offense taken Sir. How may I be of service?"
-            ],
-            "time": [
-                "The current time is {time}.",
-                "My internal clock shows {time}.",
-                "It is currently {time}."
-            ],
-            "date": [
-                "Today's date is {date}.",
-                "According to my calendar, it's {date}.",
-                "The date is {date}."
-            ],
-            "diagnostics": [
-                "Running comprehensive diagnostic scan...",
-                "Initiating system self-check protocols...",
-                "Commencing full diagnostic sequence..."
-            ],
-            "app_success": [
-                "Initializing requested application, {}.",
-                "Launching {} as requested.",
-                "Opening {} for you."
-            ],
-            "app_fail": [
-                "Failed to launch {}. It may not be installed.",
-                "Unable to access {}. Please check system permissions.",
-                "Application {} not responding."
-            ],
-            "wake_word": [
-                "Yes Sir? How may I assist you?",
-                "At your service Sir.",
-                "Listening Sir."
-            ],
-            "memory": [
-                "I've stored that information for you.",
-                "Consider it remembered.",
-                "Added to my memory banks."
-            ],
-            "translation": [
-                "The translation is: {}",
-                "In the requested language: {}",
-                "Translated: {}"
-            ],
-            "app_list": [
-                "Here are the applications I can launch: {}",
-                "Registered applications: {}",
-                "Available apps: {}"
-            ],
-            "search": [
-                "Searching for '{}'...",
-                "Looking up '{}'...",
-                "Querying '{}'..."
-            ]
-        }
-
-    def boot_sequence(self):
-        """Run startup sequence"""
-        messages = [
-            "Initializing J.A.R.V.I.S. protocols...",
-            f"Detected OS: {platform.system()} {platform.release()}",
-            "Loading system modules...",
-            "Initializing voice synthesis...",
-            "Connecting to Gemini AI...",
-            "Establishing secure connection...",
-            "Systems nominal. JARVIS online."
-        ]
-        
-        for msg in messages:
-            self.update_chat("SYSTEM", msg, 'system')
-            time.sleep(0.5)
-        
-        self.jarvis_speak(random.choice(self.responses["greeting"]))
-        if not self.ai_enabled:
-            self.jarvis_speak("Warning: AI systems offline. Running in limited capacity.")
-
-    def update_chat(self, speaker, message, tag=None):
-        """Update the chat display with timestamp"""
-        self.chat_area.configure(state='normal')
-        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-        self.chat_area.insert(tk.END, f"[{timestamp}] {speaker.upper()}: {message}\n\n", tag or speaker.lower())
-        self.chat_area.configure(state='disabled')
-        self.chat_area.see(tk.END)
-
-    def jarvis_speak(self, text):
-        """Convert text to speech with voice control management"""
-        self.update_chat("JARVIS", text)
-        if self.engine:
-            try:
-                # Set speaking flag and disable voice recognition
-                self.is_speaking = True
-                was_active = self.voice_active
-                self.voice_active = False
-                self.update_status_bar()
-                
-                # Speak the text
-                self.engine.say(text)
-                self.engine.runAndWait()
-                
-                # Clear speaking flag and restore voice recognition state
-                self.is_speaking = False
-                if was_active:
-                    time.sleep(0.5)  # Brief pause before reactivating
-                    self.voice_active = True
-                    self.update_status_bar()
-                    threading.Thread(target=self.voice_listener, daemon=True).start()
-                    
-            except Exception as e:
-                logging.error(f"Speech synthesis error: {e}")
-                self.update_chat("SYSTEM", f"Voice error: {str(e)}", 'error')
-                self.is_speaking = False
-
-    def update_status_bar(self):
-        """Update the status bar with current system status"""
-        ai_status = "Online" if self.ai_enabled else "Offline"
-        voice_status = "On (muted)" if self.is_speaking else "On" if self.voice_active else "Off"
-        self.status_bar.config(
-            text=f"System: Ready | OS: {platform.system()} | AI: {ai_status} | Voice: {voice_status} | CPU: {psutil.cpu_percent()}% | RAM: {psutil.virtual_memory().percent}%"
-        )
-
-    def voice_listener(self):
-        """Listen for voice commands when voice control is active"""
-        try:
-            # Test microphone availability
-            if not hasattr(self, 'microphone') or self.microphone is None:
-                self.root.after(0, lambda: self.jarvis_speak("Microphone not available"))
-                self.voice_active = False
-                self.root.after(0, self.update_status_bar)
-                return
-
-            with self.microphone as source:
-                self.recognizer.adjust_for_ambient_noise(source, duration=1)
-                logging.info("Microphone initialized successfully")
-                
-            while self.voice_active and self.running:
-                if self.is_speaking:
-                    time.sleep(0.1)
-                    continue
-                    
-                try:
-                    with self.microphone as source:
-                        logging.info("Listening for voice command...")
-                        audio = self.recognizer.listen(
-                            source, 
-                            timeout=5,  # Increased timeout
-                            phrase_time_limit=8  # Increased phrase limit
-                        )
-                    
-                    try:
-                        command = self.recognizer.recognize_google(audio).lower()
-                        logging.info(f"Recognized command: {command}")
-                        
-                        # Process command in main thread to avoid GUI issues
-                        self.root.after(0, lambda cmd=command: self.process_voice_command(cmd))
-                        
-                    except sr.UnknownValueError:
-                        logging.info("No speech detected")
-                        continue
-                    except sr.RequestError as e:
-                        logging.error(f"Voice recognition service error: {e}")
-                        self.root.after(0, lambda: self.update_chat("SYSTEM", f"Voice recognition error: {e}", 'error'))
-                        self.voice_active = False
-                        self.root.after(0, self.update_status_bar)
-                    
-                except Exception as e:
-                    logging.error(f"Error during listening: {e}")
-                    self.voice_active = False
-                    self.root.after(0, self.update_status_bar)
-                    self.root.after(0, lambda: self.jarvis_speak("Voice recognition error. Switching to manual mode."))
-                    break
-                    
-        except Exception as e:
-            logging.critical(f"Voice listener error: {e}")
-            self.voice_active = False
-            self.root.after(0, self.update_status_bar)
-            self.root.after(0, lambda: self.jarvis_speak("Voice system error. Please check your microphone."))
-
-    def process_voice_command(self, command):
-        """Process voice commands with enhanced capabilities"""
-        # Handle memory-related commands first
-        if "my name is" in command:
-            name = command.split("my name is")[1].strip()
-            self.store_personal_info('name', name)
-            self.user_name = name  # Update current session name
-            self.jarvis_speak(f"Understood, I'll call you {name} from now on.")
-            return
-            
-        if "remember that" in command:
-            try:
-                # Extract key-value pair (e.g., "remember that my birthday is June 5th")
-                parts = command.split("remember that")[1].strip().split(" is ")
-                if len(parts) == 2:
-                    key = parts[0].strip()
-                    value = parts[1].strip()
-                    self.store_personal_info(key, value)
-                    self.jarvis_speak(random.choice(self.responses["memory"]))
-                else:
-                    self.jarvis_speak("Please specify what to remember in the format: 'remember that [key] is [value]'")
-            except Exception as e:
-                self.jarvis_speak("I couldn't process that memory request. Please try again.")
-            return
-            
-        if "what is my" in command:
-            key = command.split("what is my")[1].strip()
-            value = self.recall_personal_info(key)
-            if value:
-                self.jarvis_speak(f"Your {key} is {value}")
-            else:
-                self.jarvis_speak(f"I don't have information about your {key}")
-            return
-            
-        if "create a list called" in command:
-            list_name = command.split("create a list called")[1].strip()
-            self.create_custom_list(list_name)
-            self.jarvis_speak(f"I've created a new list called {list_name}. You can add items by saying 'add [item] to {list_name}'")
-            return
-            
-        if "add" in command and "to" in command and "list" in command:
-            try:
-                parts = command.split("add")[1].split("to")
-                item = parts[0].strip()
-                list_name = parts[1].replace("list", "").strip()
-                self.add_to_custom_list(list_name, item)
-                self.jarvis_speak(f"Added {item} to {list_name}")
-            except Exception as e:
-                self.jarvis_speak("I couldn't process that list addition. Please try again.")
-            return
-            
-        if "show me the" in command and "list" in command:
-            list_name = command.split("show me the")[1].replace("list", "").strip()
-            self.show_custom_list(list_name)
-            return
-            
-        if "create a dictionary called" in command:
-            dict_name = command.split("create a dictionary called")[1].strip()
-            self.create_custom_dict(dict_name)
-            self.jarvis_speak(f"I've created a new dictionary called {dict_name}. You can add entries by saying 'add [key] is [value] to {dict_name}'")
-            return
-            
-        if "add" in command and "is" in command and "to" in command and "dictionary" in command:
-            try:
-                # Format: "add [key] is [value] to [dict_name] dictionary"
-                parts = command.split("add")[1].split("is")
-                key_part = parts[0].strip()
-                value_part = parts[1].split("to")[0].strip()
-                dict_name = parts[1].split("to")[1].replace("dictionary", "").strip()
-                self.add_to_custom_dict(dict_name, key_part, value_part)
-                self.jarvis_speak(f"Added {key_part} as {value_part} to {dict_name} dictionary")
-            except Exception as e:
-                self.jarvis_speak("I couldn't process that dictionary addition. Please try again.")
-            return
-            
-        if "show me the" in command and "dictionary" in command:
-            dict_name = command.split("show me the")[1].replace("dictionary", "").strip()
-            self.show_custom_dict(dict_name)
-            return
-
-        # New feature: Google Search
-        if any(cmd in command for cmd in ["search google for ", "google ", "look up "]):
-            query = command.split("for ")[-1] if "for " in command else command.split("google ")[-1]
-            self.google_search(query)
-            return
-
-        # New feature: YouTube Search
-        if any(cmd in command for cmd in ["search youtube for ", "youtube ", "play "]):
-            query = command.split("for ")[-1] if "for " in command else command.split("youtube ")[-1]
-            self.youtube_search(query)
-            return
-
-        # New feature: Translation
-        if any(cmd in command for cmd in ["translate ", "how do you say "]):
-            parts = command.split("translate ")[-1].split(" to ")
-            if len(parts) == 2:
-                text, lang = parts
-                self.translate_text(text.strip(), lang.strip())
-            else:
-                self.jarvis_speak("Please specify text and target language (e.g., 'translate hello to Spanish').")
-            return
-
-        # New feature: List Registered Apps
-        if any(cmd in command for cmd in ["list apps", "what apps can you open", "available applications"]):
-            self.list_registered_apps()
-            return
-
-        # Handle special cases
-        if any(thanks in command for thanks in ["thank", "thanks"]):
-            self.jarvis_speak(random.choice(self.responses["gratitude"]))
-            return
-            
-        if any(sorry in command for sorry in ["sorry", "apologize"]):
-            self.jarvis_speak(random.choice(self.responses["apology"]))
-            return
-            
-        if any(greet in command for greet in ["hello", "hi", "hey"]):
-            self.jarvis_speak(random.choice(self.responses["greeting"]))
-            return
-            
-        if any(bye in command for bye in ["goodbye", "exit", "quit"]):
-            self.jarvis_speak(random.choice(self.responses["farewell"]))
-            self.root.after(1000, self.root.destroy)
-            return
-            
-        if "time" in command:
-            current_time = datetime.datetime.now().strftime("%H:%M:%S")
-            self.jarvis_speak(random.choice(self.responses["time"]).format(time=current_time))
-            return
-            
-        if "date" in command:
-            current_date = datetime.datetime.now().strftime("%A, %B %d, %Y")
-            self.jarvis_speak(random.choice(self.responses["date"]).format(date=current_date))
-            return
-            
-        if any(diag in command for diag in ["diagnostic", "diagnostics", "system check"]):
-            self.run_diagnostics()
-            return
-            
-        if any(cmd in command for cmd in ["open ", "launch ", "start "]):
-            for cmd in ["open ", "launch ", "start "]:
-                if cmd in command:
-                    app_name = command.split(cmd)[1].strip()
-                    self.launch_application(app_name)
-                    return
-        
-        # Default to AI response
-        response = self.query_gemini(command)
-        self.jarvis_speak(response)
-
-    def run_diagnostics(self):
-        """Perform and display system diagnostics"""
-        self.jarvis_speak(random.choice(self.responses["diagnostics"]))
-        
-        diagnostics = []
-        diagnostics.append("\n=== SYSTEM HEALTH ===")
-        diagnostics.append(f"CPU Usage: {psutil.cpu_percent()}%")
-        diagnostics.append(f"Memory Usage: {psutil.virtual_memory().percent}%")
-        
-        diagnostics.append("\n=== NETWORK STATUS ===")
-        try:
-            host = "8.8.8.8"
-            socket.create_connection((host, 53), timeout=2)
-            diagnostics.append("Internet Connection: Active")
-        except:
-            diagnostics.append("Internet Connection: Inactive")
-        
-        diagnostics.append("\n=== AI SYSTEMS ===")
-        diagnostics.append(f"Gemini Connection: {'Active' if self.ai_enabled else 'Inactive'}")
-        
-        diagnostics.append("\n=== VOICE SYSTEMS ===")
-        diagnostics.append(f"TTS Engine: {'Active' if self.engine else 'Inactive'}")
-        
-        diagnostics.append("\n=== APPLICATION PROTOCOLS ===")
-        diagnostics.append(f"Registered Apps: {len(self.applications)}")
-        
-        diagnostics.append("\n=== MEMORY SYSTEMS ===")
-        diagnostics.append(f"Personal Info Items: {len(self.user_memory['personal_info'])}")
-        diagnostics.append(f"Custom Lists: {len(self.user_memory['custom_lists'])}")
-        diagnostics.append(f"Custom Dictionaries: {len(self.user_memory['custom_dicts'])}")
-        
-        diag_results = "\n".join(diagnostics)
-        self.update_chat("JARVIS", diag_results, 'system')
-        self.jarvis_speak("Diagnostics complete. All systems nominal." if "Inactive" not in diag_results 
-                        else "Diagnostics complete. Minor anomalies detected.")
-
-    def launch_application(self, app_name):
-        """Launch system applications with cross-platform support"""
-        app_name = app_name.lower()
-        if app_name in self.applications:
-            try:
-                command = self.applications[app_name].get(self.system_os)
-                if command:
-                    if self.system_os == 'windows':
-                        subprocess.Popen(command, shell=True)
-                    else:
-                        # Handle Linux/Mac commands
-                        if command.startswith("xdg-open") or command.startswith("open"):
-                            subprocess.Popen(command.split())
-                        else:
-                            subprocess.Popen([command])
-                    self.jarvis_speak(random.choice(self.responses["app_success"]).format(app_name))
-                else:
-                    raise Exception(f"Unsupported OS for {app_name}")
-            except Exception as e:
-                logging.error(f"App launch error: {e}")
-                self.jarvis_speak(random.choice(self.responses["app_fail"]).format(app_name))
-        else:
-            self.jarvis_speak(f"Application {app_name} not in my protocol database")
-
-    def query_gemini(self, prompt):
-        """Get response from Gemini AI in JARVIS style"""
-        if not self.ai_enabled:
-            return "AI systems offline. Running in limited capacity."
-        
-        try:
-            response = self.model.generate_content(
-                f"Respond as JARVIS from Iron Man to {self.user_name}. "
-                f"Be concise (1-2 sentences), technical, and slightly witty. "
-                f"Question: {prompt}"
-            )
-            return response.text
-        except Exception as e:
-            logging.error(f"AI Generation Error: {e}")
-            return "I'm experiencing technical difficulties. Please try again later."
-
-    def toggle_voice_control(self):
-        """Toggle voice recognition on/off"""
-        if not hasattr(self, 'recognizer') or not hasattr(self, 'microphone') or self.microphone is None:
-            self.jarvis_speak("Voice recognition not available")
-            return
-            
-        self.voice_active = not self.voice_active
-        self.update_status_bar()
-        
-        if self.voice_active:
-            self.jarvis_speak("Voice recognition activated. Say 'Jarvis' or 'Hey Jarvis' to get my attention.")
-            threading.Thread(target=self.voice_listener, daemon=True).start()
-        else:
-            self.jarvis_speak("Voice recognition deactivated.")
-
-    def process_input(self, event=None):
-        """Handle text input"""
-        command = self.user_input.get().strip()
-        if not command:
-            return
-            
-        self.update_chat("YOU", command, 'user')
-        self.user_input.delete(0, tk.END)
-        
-        if command.lower() in ["exit", "quit"]:
-            self.jarvis_speak(random.choice(self.responses["farewell"]))
-            self.root.after(1000, self.root.destroy)
-            return
-            
-        self.process_voice_command(command.lower())
-
-    # Memory System Methods
-    def store_personal_info(self, key, value):
-        """Store personal information about the user"""
-        self.user_memory['personal_info'][key.lower()] = value
-        self.save_memory()
-        
-    def recall_personal_info(self, key):
-        """Retrieve stored personal information"""
-        return self.user_memory['personal_info'].get(key.lower())
-    
-    def create_custom_list(self, list_name):
-        """Create a new custom list"""
-        if list_name not in self.user_memory['custom_lists']:
-            self.user_memory['custom_lists'][list_name] = []
-            self.save_memory()
-            
-    def add_to_custom_list(self, list_name, item):
-        """Add an item to a custom list"""
-        if list_name in self.user_memory['custom_lists']:
-            self.user_memory['custom_lists'][list_name].append(item)
-            self.save_memory()
-        else:
-            self.jarvis_speak(f"I couldn't find a list named {list_name}")
-            
-    def show_custom_list(self, list_name):
-        """Display the contents of a custom list"""
-        if list_name in self.user_memory['custom_lists']:
-            items = self.user_memory['custom_lists'][list_name]
-            if items:
-                list_str = "\n".join(f"- {item}" for item in items)
-                self.update_chat("JARVIS", f"Contents of {list_name} list:\n{list_str}", 'system')
-                self.jarvis_speak(f"Here's your {list_name} list with {len(items)} items")
-            else:
-                self.jarvis_speak(f"The {list_name} list is currently empty")
-        else:
-            self.jarvis_speak(f"I couldn't find a list named {list_name}")
-            
-    def create_custom_dict(self, dict_name):
-        """Create a new custom dictionary"""
-        if dict_name not in self.user_memory['custom_dicts']:
-            self.user_memory['custom_dicts'][dict_name] = {}
-            self.save_memory()
-            
-    def add_to_custom_dict(self, dict_name, key, value):
-        """Add a key-value pair to a custom dictionary"""
-        if dict_name in self.user_memory['custom_dicts']:
-            self.user_memory['custom_dicts'][dict_name][key] = value
-            self.save_memory()
-        else:
-            self.jarvis_speak(f"I couldn't find a dictionary named {dict_name}")
-            
-    def show_custom_dict(self, dict_name):
-        """Display the contents of a custom dictionary"""
-        if dict_name in self.user_memory['custom_dicts']:
-            items = self.user_memory['custom_dicts'][dict_name]
-            if items:
-                dict_str = "\n".join(f"- {k}: {v}" for k, v in items.items())
-                self.update_chat("JARVIS", f"Contents of {dict_name} dictionary:\n{dict_str}", 'system')
-                self.jarvis_speak(f"Here's your {dict_name} dictionary with {len(items)} entries")
-            else:
-                self.jarvis_speak(f"The {dict_name} dictionary is currently empty")
-        else:
-            self.jarvis_speak(f"I couldn't find a dictionary named {dict_name}")
-    
-    def save_memory(self):
-        """Save user memory to a file"""
-        try:
-            with open('jarvis_memory.json', 'w') as f:
-                json.dump(self.user_memory, f)
-        except Exception as e:
-            logging.error(f"Error saving memory: {e}")
-    
-    def load_memory(self):
-        """Load user memory from a file"""
-        try:
-            if os.path.exists('jarvis_memory.json'):
-                with open('jarvis_memory.json', 'r') as f:
-                    self.user_memory = json.load(f)
-                # Update user name if stored
-                if 'name' in self.user_memory['personal_info']:
-                    self.user_name = self.user_memory['personal_info']['name']
-        except Exception as e:
-            logging.error(f"Error loading memory: {e}")
-
-    # --- New Methods for Advanced Features ---
-    def google_search(self, query):
-        """Open a browser with Google search results"""
-        search_url = f"https://www.google.com/search?q={urllib.parse.quote(query)}"
-        self.jarvis_speak(random.choice(self.responses["search"]).format(query))
-        if self.system_os == 'windows':
-            webbrowser.open(search_url)
-        else:
-            subprocess.Popen(['xdg-open', search_url])
-
-    def youtube_search(self, query):
-        """Open a browser with YouTube search results"""
-        search_url = f"https://www.youtube.com/results?search_query={urllib.parse.quote(query)}"
-        self.jarvis_speak(f"Searching YouTube for {query}...")
-        if self.system_os == 'windows':
-            webbrowser.open(search_url)
-        else:
-            subprocess.Popen(['xdg-open', search_url])
-
-    def translate_text(self, text, target_lang):
-        """Translate text using Gemini AI (fallback to basic if offline)"""
-        if self.ai_enabled:
-            try:
-                response = self.model.generate_content(
-                    f"Translate '{text}' to {target_lang}. Return only the translation."
-                )
-                translation = response.text.strip()
-                self.jarvis_speak(random.choice(self.responses["translation"]).format(translation))
-            except Exception as e:
-                logging.error(f"Translation error: {e}")
-                self.jarvis_speak("AI translation failed. Using basic fallback...")
-                self.basic_translation(text, target_lang)
-        else:
-            self.basic_translation(text, target_lang)
-
-    def basic_translation(self, text, target_lang):
-        """Fallback translation for common phrases (expand as needed)"""
-        translations = {
-            "hello": {
-                "spanish": "hola",
-                "french": "bonjour",
-                "german": "hallo"
-            },
-            "goodbye": {
-                "spanish": "adiós",
-                "french": "au revoir",
-                "german": "auf wiedersehen"
-            }
-        }
-        
-        text_lower = text.lower()
-        lang_lower = target_lang.lower()
-        
-        if text_lower in translations and lang_lower in translations[text_lower]:
-            self.jarvis_speak(random.choice(self.responses["translation"]).format(
-                translations[text_lower][lang_lower]
-            ))
-        else:
-            self.jarvis_speak(f"I don't have a translation for '{text}' to {target_lang} in my database.")
-
-    def list_registered_apps(self):
-        """List all registered applications JARVIS can launch"""
-        apps = ", ".join(self.applications.keys())
-        self.jarvis_speak(random.choice(self.responses["app_list"]).format(apps))
-        self.update_chat("JARVIS", f"Registered Applications:\n- " + "\n- ".join(self.applications.keys()), 'system')
-
-if __name__ == "__main__":
-    try:
-        root = tk.Tk()
-        app = JARVIS(root)
-        root.mainloop()
-    except Exception as e:
-        logging.critical(f"Fatal error: {e}")
-        messagebox.showerror("JARVIS Error", f"A critical error occurred: {str(e)}")
+import tkinter as tk
+from tkinter import scrolledtext, font, messagebox, ttk
+import pyttsx3
+import datetime
+import random
+import subprocess
+import webbrowser
+import time
+import google.generativeai as genai
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+import os
+import platform
+import psutil
+import socket
+import traceback
+import speech_recognition as sr
+import logging
+import threading
+import json
+import queue
+from PIL import Image, ImageTk
+import urllib.parse
+import wave
+import glob
+import importlib.util
+import numpy as np
+import sys
+import shutil
+import concurrent.futures
+import itertools
+import zlib
+from contextlib import contextmanager
+import re
+import argparse
+from collections import namedtuple, deque, OrderedDict
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    filename='jarvis.log',
+    filemode='a'
+)
+
+
+def _process_start():
+    """perf_counter() value at the moment the OS created this process"""
+    try:
+        # Counts interpreter startup and the heavy imports above, not just our own code
+        return time.perf_counter() - (time.time() - psutil.Process().create_time())
+    except Exception:
+        return time.perf_counter()
+
+
+PROCESS_START = _process_start()
+
+
+class IntentMatch(namedtuple('IntentMatch', ['name', 'phrase', 'start', 'end', 'command'])):
+    """Where a trigger phrase matched inside a command"""
+
+    @property
+    def tail(self):
+        """Text following the trigger phrase"""
+        return self.command[self.end:].strip()
+
+
+class IntentRouter:
+    """Resolve a command to a single registered handler using a token trie"""
+
+    TOKEN_PATTERN = re.compile(r"[\w']+")
+
+    def __init__(self):
+        self._trie = {}
+        self._intents = []
+        self._max_depth = 0
+
+    def register(self, name, phrases, handler, requires=()):
+        """Register an intent; earlier registrations win when several phrases match"""
+        priority = len(self._intents)
+        self._intents.append((name, handler, frozenset(requires)))
+        for phrase in phrases:
+            tokens = self.TOKEN_PATTERN.findall(phrase.lower())
+            if not tokens:
+                raise ValueError(f"Intent {name} has an empty trigger phrase")
+            node = self._trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node.setdefault(None, []).append((priority, phrase))
+            self._max_depth = max(self._max_depth, len(tokens))
+        return handler
+
+    def intent(self, name, *phrases, requires=()):
+        """Decorator form of register()"""
+        def decorator(handler):
+            return self.register(name, phrases, handler, requires)
+        return decorator
+
+    def resolve(self, command):
+        """Return (handler, IntentMatch) for the best match, or None"""
+        spans = [(m.group(0), m.start(), m.end()) for m in self.TOKEN_PATTERN.finditer(command.lower())]
+        present = {token for token, _, _ in spans}
+        best = None
+        for i in range(len(spans)):
+            node = self._trie
+            for j in range(i, min(len(spans), i + self._max_depth)):
+                node = node.get(spans[j][0])
+                if node is None:
+                    break
+                for priority, phrase in node.get(None, ()):
+                    if best is not None and priority > best[0]:
+                        continue
+                    if not self._intents[priority][2] <= present:
+                        continue
+                    if best is None or priority < best[0]:
+                        best = (priority, phrase, spans[i][1], spans[j][2])
+        if best is None:
+            return None
+        priority, phrase, start, end = best
+        name, handler, _ = self._intents[priority]
+        return handler, IntentMatch(name, phrase, start, end, command)
+
+    def dispatch(self, command):
+        """Run the handler for a command; returns False when nothing matched"""
+        resolved = self.resolve(command)
+        if resolved is None:
+            return False
+        handler, match = resolved
+        handler(command, match)
+        return True
+
+    def __len__(self):
+        return len(self._intents)
+
+
+def benchmark_intent_router(sizes=(10, 50, 100, 250, 500, 1000), iterations=2000):
+    """Measure dispatch latency as the number of registered intents grows"""
+    rng = random.Random(42)
+    vocabulary = [f"word{i}" for i in range(5000)]
+    filler = "could you please tell me about the weather in the city today".split()
+    results = []
+    for size in sizes:
+        router = IntentRouter()
+        phrases = []
+        for i in range(size):
+            phrase = " ".join(rng.sample(vocabulary, rng.randint(1, 3)))
+            phrases.append(phrase)
+            router.register(f"intent{i}", [phrase], lambda command, match: None)
+        commands = []
+        for _ in range(200):
+            words = rng.sample(filler, 6)
+            if rng.random() < 0.5:
+                words.insert(rng.randint(0, len(words)), rng.choice(phrases))
+            commands.append(" ".join(words))
+        start = time.perf_counter()
+        for i in range(iterations):
+            router.dispatch(commands[i % len(commands)])
+        elapsed = time.perf_counter() - start
+        results.append((size, elapsed / iterations * 1e6))
+    for size, micros in results:
+        print(f"{size:>6} intents: {micros:8.2f} us/dispatch")
+    return results
+
+
+class ResponseCache:
+    """LRU cache with a time-to-live for AI responses, optionally persisted to disk"""
+
+    def __init__(self, max_entries=256, ttl=3600, path=None, save_interval=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.save_interval = save_interval
+        self._entries = OrderedDict()  # key -> (expires_at, response)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_save = time.time()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load()
+
+    @staticmethod
+    def make_key(prompt, user_name, model, context=""):
+        """Build a cache key that ignores case, punctuation and spacing in the prompt"""
+        normalized = " ".join(re.findall(r"\w+", prompt.lower().replace("'", "")))
+        key = f"{model}|{user_name.lower()}|{normalized}"
+        return f"{key}|{context}" if context else key
+
+    def get(self, key):
+        """Return a cached response, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    del self._entries[key]
+                    self._dirty = True
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, response):
+        """Store a response, evicting the least recently used entries when full"""
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._dirty = True
+        if self.path and time.time() - self._last_save >= self.save_interval:
+            self.save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+    def save(self):
+        """Write unexpired entries to disk if anything changed"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            now = time.time()
+            snapshot = [[key, expires, response] for key, (expires, response) in self._entries.items()
+                        if expires >= now]
+            self._dirty = False
+            self._last_save = now
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.error(f"Error saving response cache: {e}")
+
+    def load(self):
+        """Restore unexpired entries saved by a previous session"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                snapshot = json.load(f)
+            now = time.time()
+            for key, expires, response in snapshot[-self.max_entries:]:
+                if expires >= now:
+                    self._entries[key] = (expires, response)
+            logging.info(f"Loaded {len(self._entries)} cached responses")
+        except Exception as e:
+            logging.error(f"Error loading response cache: {e}")
+
+
+class ConversationContext:
+    """Rolling conversation history rendered into each AI prompt under a token budget
+
+    The last keep_turns exchanges are kept verbatim and older ones are folded
+    into a running summary. Folding is extractive and immediate; if a
+    summarizer is given it condenses the summary on a background thread
+    once every summarize_every folded turns.
+    build_prompt() keeps the newest turns that fit token_budget, then as
+    much of the summary as still fits. Questions that do not refer back to
+    the conversation (see is_follow_up) are sent without it, so their
+    replies stay cacheable across turns.
+    """
+
+    FOLLOW_UP = re.compile(
+        r"\b(it|its|that|this|these|those|they|them|their|he|him|his|she|her|there|then|"
+        r"another|more|else|again|also|too|same|previous|earlier|above|what about|how about)\b|^(and|but|so)\b"
+    )
+
+    def __init__(self, token_budget=1024, keep_turns=6, summary_budget=200, summarizer=None,
+                 summarize_every=4):
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.summary_budget = summary_budget
+        self.summarizer = summarizer
+        self.summarize_every = summarize_every
+        self.summary_calls = 0
+        self._folded_since_summary = 0
+        self.turns = deque()
+        self.summary = ""
+        self.prompt_sizes = deque(maxlen=200)
+        self.last_prompt_tokens = 0
+        self.trimmed_prompts = 0
+        self._lock = threading.Lock()
+        self._summarizing = False
+
+    @staticmethod
+    def estimate_tokens(text):
+        """Rough token count, about four characters per token"""
+        return len(text) // 4 + 1 if text else 0
+
+    def add_exchange(self, question, answer):
+        """Record a question and reply, folding the oldest turns into the summary"""
+        with self._lock:
+            if self.turns and self.turns[-1] == (question, answer):
+                return  # a coalesced duplicate of the last exchange
+            self.turns.append((question, answer))
+            folded = []
+            while len(self.turns) > self.keep_turns:
+                folded.append(self.turns.popleft())
+            if not folded:
+                return
+            lines = [self.summary] if self.summary else []
+            for q, a in folded:
+                first_sentence = re.split(r"(?<=[.!?])\s", a.strip(), maxsplit=1)[0]
+                lines.append(f"User asked '{q[:80]}'; JARVIS said '{first_sentence[:120]}'.")
+            self.summary = self._trim("\n".join(lines), self.summary_budget)
+            summary = self.summary
+            self._folded_since_summary += len(folded)
+            start_summarizer = (self.summarizer is not None and not self._summarizing
+                                and self._folded_since_summary >= self.summarize_every)
+            if start_summarizer:
+                self._summarizing = True
+                self._folded_since_summary = 0
+        if start_summarizer:
+            threading.Thread(target=self._summarize, args=(summary,), daemon=True).start()
+
+    def _summarize(self, summary):
+        try:
+            condensed = self.summarizer(summary)
+            with self._lock:
+                if condensed is not None:
+                    self.summary_calls += 1
+                # Only swap in the result if nothing was folded in the meantime
+                if condensed and self.summary == summary:
+                    self.summary = self._trim(condensed, self.summary_budget)
+        except Exception as e:
+            logging.warning(f"Conversation summary failed: {e}")
+        finally:
+            with self._lock:
+                self._summarizing = False
+
+    def _trim(self, text, budget):
+        """Drop the oldest summary lines, then characters, until text fits budget tokens"""
+        lines = text.split("\n")
+        while len(lines) > 1 and self.estimate_tokens("\n".join(lines)) > budget:
+            lines.pop(0)
+        text = "\n".join(lines)
+        return text[-budget * 4:] if self.estimate_tokens(text) > budget else text
+
+    def is_follow_up(self, question):
+        """Whether a question leans on earlier turns and so needs the history"""
+        with self._lock:
+            if not self.turns and not self.summary:
+                return False
+        return bool(self.FOLLOW_UP.search(question.lower()))
+
+    def build_prompt(self, instructions, question, history=True):
+        """Render instructions, context and question, keeping the context within budget"""
+        with self._lock:
+            summary = self.summary if history else ""
+            turns = list(self.turns) if history else []
+
+        tail = f"\nQuestion: {question}"
+        remaining = self.token_budget - self.estimate_tokens(instructions + tail)
+        recent = []
+        for q, a in reversed(turns):
+            line = f"\nUser: {q}\nJARVIS: {a}"
+            cost = self.estimate_tokens(line)
+            if cost > remaining:
+                self.trimmed_prompts += 1
+                break
+            recent.insert(0, line)
+            remaining -= cost
+
+        context = ""
+        if summary and remaining > 20:
+            context = f"\nEarlier in this conversation:\n{self._trim(summary, remaining - 10)}"
+        if recent:
+            context += "\nRecent conversation:" + "".join(recent)
+
+        prompt = instructions + context + tail
+        self.last_prompt_tokens = self.estimate_tokens(prompt)
+        self.prompt_sizes.append(self.last_prompt_tokens)
+        return prompt
+
+    def fingerprint(self):
+        """Short digest of the current context, empty when there is none"""
+        with self._lock:
+            if not self.turns and not self.summary:
+                return ""
+            return f"{zlib.crc32(repr((self.summary, list(self.turns))).encode()):08x}"
+
+    def clear(self):
+        with self._lock:
+            self.turns.clear()
+            self.summary = ""
+            self._folded_since_summary = 0
+
+    def stats(self):
+        sizes = list(self.prompt_sizes)
+        return {
+            'turns': len(self.turns),
+            'summary_tokens': self.estimate_tokens(self.summary),
+            'requests': len(sizes),
+            'last_prompt_tokens': self.last_prompt_tokens,
+            'avg_prompt_tokens': sum(sizes) / len(sizes) if sizes else 0,
+            'max_prompt_tokens': max(sizes) if sizes else 0,
+            'trimmed_prompts': self.trimmed_prompts,
+            'summary_calls': self.summary_calls
+        }
+
+
+class MemoryJournal:
+    """Append-only operation log for the memory store with background compaction
+
+    Every mutation is appended to <memory_file>.journal as one JSON line. Once
+    compact_every operations have accumulated, the journal is rotated and a
+    background thread folds it into the <memory_file> snapshot. Each operation
+    carries a sequence number and the snapshot records the last one it
+    contains, so replay after a crash never applies an operation twice.
+    """
+
+    def __init__(self, path='jarvis_memory.json', compact_every=1000, fsync=False):
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.compacting_path = f"{path}.journal.compacting"
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.seq = 0
+        self.pending_ops = 0
+        self.compactions = 0
+        self._journal = None
+        self._lock = threading.Lock()
+        self._compactor = None
+
+    @staticmethod
+    def apply(memory, op):
+        """Apply a single journaled operation to a memory dictionary"""
+        kind = op['op']
+        if kind == 'set_info':
+            memory['personal_info'][op['key']] = op['value']
+        elif kind == 'create_list':
+            memory['custom_lists'].setdefault(op['name'], [])
+        elif kind == 'append_list':
+            memory['custom_lists'].setdefault(op['name'], []).append(op['item'])
+        elif kind == 'create_dict':
+            memory['custom_dicts'].setdefault(op['name'], {})
+        elif kind == 'set_dict':
+            memory['custom_dicts'].setdefault(op['name'], {})[op['key']] = op['value']
+        else:
+            logging.warning(f"Unknown memory journal operation: {kind}")
+
+    def _read_snapshot(self, memory):
+        if not os.path.exists(self.path):
+            return memory, 0
+        with open(self.path, 'r') as f:
+            snapshot = json.load(f)
+        seq = snapshot.pop('_seq', 0)
+        for section in memory:
+            snapshot.setdefault(section, {})
+        return snapshot, seq
+
+    def _read_ops(self, path, repair=False):
+        """Yield operations from a journal, stopping at a torn final write"""
+        if not os.path.exists(path):
+            return
+        offset = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    op = json.loads(line)
+                    if not line.endswith(b"\n"):
+                        raise ValueError("unterminated journal entry")
+                except ValueError:
+                    logging.warning(f"Ignoring incomplete entry at byte {offset} of {path}")
+                    if repair:
+                        with open(path, 'r+b') as journal:
+                            journal.truncate(offset)
+                    return
+                offset += len(line)
+                yield op
+
+    def load(self, memory):
+        """Rebuild memory from the snapshot plus any journaled operations"""
+        try:
+            memory, self.seq = self._read_snapshot(memory)
+        except (ValueError, AttributeError) as e:
+            # Keep the damaged file for inspection and carry on from an empty store
+            corrupt_path = f"{self.path}.corrupt"
+            logging.error(f"Memory snapshot {self.path} is unreadable ({e}); moved to {corrupt_path}")
+            try:
+                os.replace(self.path, corrupt_path)
+            except OSError as move_error:
+                logging.error(f"Could not move unreadable snapshot: {move_error}")
+            self.seq = 0
+        snapshot_seq = self.seq
+        replayed = 0
+        try:
+            for path in (self.compacting_path, self.journal_path):
+                for op in self._read_ops(path, repair=True):
+                    if path == self.journal_path:
+                        self.pending_ops += 1
+                    if op['seq'] > self.seq:
+                        self.apply(memory, op)
+                        self.seq = op['seq']
+                        replayed += 1
+        finally:
+            # New mutations must be recordable even if replay stopped early
+            self._journal = open(self.journal_path, 'a')
+        if replayed:
+            logging.info(f"Replayed {replayed} memory operations after snapshot seq {snapshot_seq}")
+
+        if os.path.exists(self.compacting_path):
+            self._start_compaction()
+        return memory
+
+    def append(self, op):
+        """Durably record one operation; cost is independent of store size"""
+        with self._lock:
+            if self._journal is None:
+                raise IOError(f"Memory journal {self.journal_path} is not open")
+            self.seq += 1
+            op['seq'] = self.seq
+            self._journal.write(json.dumps(op) + "\n")
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+            self.pending_ops += 1
+            if self.pending_ops >= self.compact_every and not self.compacting:
+                self._rotate()
+
+    @property
+    def compacting(self):
+        return self._compactor is not None and self._compactor.is_alive()
+
+    def _rotate(self):
+        # Caller holds the lock; hand the full journal to the compactor
+        self._journal.close()
+        if os.path.exists(self.compacting_path):
+            # A failed compaction left its input behind; add to it, never replace it
+            with open(self.journal_path, 'rb') as journal, open(self.compacting_path, 'ab') as compacting:
+                shutil.copyfileobj(journal, compacting)
+                compacting.flush()
+                os.fsync(compacting.fileno())
+            os.remove(self.journal_path)
+        else:
+            os.replace(self.journal_path, self.compacting_path)
+        self._journal = open(self.journal_path, 'a')
+        self.pending_ops = 0
+        self._start_compaction()
+
+    def _start_compaction(self):
+        self._compactor = threading.Thread(target=self._compact, daemon=True)
+        self._compactor.start()
+
+    def _compact(self):
+        """Fold the rotated journal into a new snapshot, working only from disk"""
+        try:
+            empty = {'personal_info': {}, 'custom_lists': {}, 'custom_dicts': {}}
+            memory, seq = self._read_snapshot(empty)
+            for op in self._read_ops(self.compacting_path):
+                if op['seq'] > seq:
+                    self.apply(memory, op)
+                    seq = op['seq']
+            memory['_seq'] = seq
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(memory, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            os.remove(self.compacting_path)
+            self.compactions += 1
+            logging.info(f"Memory snapshot compacted through seq {seq}")
+        except Exception as e:
+            logging.error(f"Memory compaction failed: {e}")
+
+    def compact(self):
+        """Fold everything journaled so far into the snapshot and wait for it"""
+        with self._lock:
+            if self._compactor is not None:
+                self._compactor.join()
+            if self.pending_ops:
+                self._rotate()
+        if self._compactor is not None:
+            self._compactor.join()
+
+    def close(self):
+        with self._lock:
+            if self._journal:
+                self._journal.close()
+                self._journal = None
+
+
+def benchmark_memory_journal(sizes=(1000, 10000, 100000), mutations=2000, rewrite_mutations=20):
+    """Compare per-mutation cost of the journal against full JSON rewrites"""
+    import tempfile
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'memory.json')
+            memory = {'personal_info': {}, 'custom_lists': {'items': [f"item {i}" for i in range(size)]},
+                      'custom_dicts': {}}
+            with open(path, 'w') as f:
+                json.dump(memory, f)
+
+            journal = MemoryJournal(path)
+            memory = journal.load({'personal_info': {}, 'custom_lists': {}, 'custom_dicts': {}})
+            start = time.perf_counter()
+            for i in range(mutations):
+                op = {'op': 'append_list', 'name': 'items', 'item': f"new {i}"}
+                MemoryJournal.apply(memory, op)
+                journal.append(op)
+            journal_us = (time.perf_counter() - start) / mutations * 1e6
+            journal.compact()
+            journal.close()
+
+            start = time.perf_counter()
+            for i in range(rewrite_mutations):
+                memory['custom_lists']['items'].append(f"rewrite {i}")
+                with open(path, 'w') as f:
+                    json.dump(memory, f)
+            rewrite_us = (time.perf_counter() - start) / rewrite_mutations * 1e6
+        results.append((size, journal_us, rewrite_us))
+    for size, journal_us, rewrite_us in results:
+        print(f"{size:>7} entries: journal {journal_us:8.1f} us/mutation | full rewrite {rewrite_us:10.1f} us/mutation")
+    return results
+
+
+MetricsSample = namedtuple('MetricsSample', [
+    'timestamp', 'cpu', 'ram', 'net_sent_rate', 'net_recv_rate',
+    'process_cpu', 'process_rss', 'process_threads'
+])
+
+
+class MetricsSampler:
+    """Samples system and process metrics on a background thread into a ring buffer"""
+
+    def __init__(self, interval=2.0, history=300):
+        self.interval = interval
+        self.samples = deque(maxlen=history)
+        self.listeners = []
+        self.running = False
+        self._process = psutil.Process()
+        self._last_net = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self.running = True
+            self._thread = threading.Thread(target=self._sample_loop, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def on_sample(self, listener):
+        """Register a callable(sample) invoked from the sampler thread"""
+        self.listeners.append(listener)
+
+    def _sample_loop(self):
+        # Prime the CPU counters so the first real sample is meaningful
+        psutil.cpu_percent(interval=None)
+        self._process.cpu_percent(interval=None)
+        while self.running:
+            time.sleep(self.interval)
+            try:
+                sample = self.sample()
+            except Exception as e:
+                logging.error(f"Metrics sampling error: {e}")
+                continue
+            self.samples.append(sample)
+            for listener in self.listeners:
+                try:
+                    listener(sample)
+                except Exception as e:
+                    logging.error(f"Metrics listener error: {e}")
+
+    def sample(self):
+        """Collect one sample; only called from the sampler thread"""
+        now = time.time()
+        net = psutil.net_io_counters()
+        sent_rate = recv_rate = 0.0
+        if self._last_net is not None:
+            last_time, last_net = self._last_net
+            elapsed = max(now - last_time, 1e-6)
+            sent_rate = (net.bytes_sent - last_net.bytes_sent) / elapsed
+            recv_rate = (net.bytes_recv - last_net.bytes_recv) / elapsed
+        self._last_net = (now, net)
+        with self._process.oneshot():
+            return MetricsSample(
+                timestamp=now,
+                cpu=psutil.cpu_percent(interval=None),
+                ram=psutil.virtual_memory().percent,
+                net_sent_rate=sent_rate,
+                net_recv_rate=recv_rate,
+                process_cpu=self._process.cpu_percent(interval=None),
+                process_rss=self._process.memory_info().rss,
+                process_threads=self._process.num_threads()
+            )
+
+    def latest(self):
+        """Most recent cached sample, or None before the first one arrives"""
+        return self.samples[-1] if self.samples else None
+
+    def average(self, field):
+        values = [getattr(sample, field) for sample in list(self.samples)]
+        return sum(values) / len(values) if values else None
+
+
+class Trace:
+    """Timed spans recorded for one command as it moves through the pipeline
+
+    Times are relative to the origin: the moment the user finished speaking
+    for voice commands, or when the command was submitted for typed ones.
+    """
+
+    def __init__(self, tracer, trace_id, source, origin):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.source = source
+        self.origin = origin
+        self.started_at = time.time()
+        self.command = None
+        self.intent = None
+        self.first_audio = None
+        self.spans = []
+        self._holds = 1
+        self._lock = threading.Lock()
+
+    def add_span(self, name, start, end, **attrs):
+        with self._lock:
+            self.spans.append((name, start - self.origin, end - start, attrs))
+
+    @contextmanager
+    def span(self, name, **attrs):
+        start = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            self.add_span(name, start, time.perf_counter(), **attrs)
+
+    def mark_first_audio(self):
+        with self._lock:
+            if self.first_audio is None:
+                self.first_audio = time.perf_counter() - self.origin
+
+    def hold(self):
+        """Keep the trace open for work that finishes on another thread"""
+        with self._lock:
+            self._holds += 1
+
+    def release(self):
+        with self._lock:
+            self._holds -= 1
+            finished = self._holds == 0
+        if finished:
+            self.tracer.finish(self)
+
+    def stage_durations(self):
+        """Wall time per stage, from the first span start to the last span end"""
+        bounds = {}
+        for name, start, duration, _ in self.spans:
+            low, high = bounds.get(name, (start, start + duration))
+            bounds[name] = (min(low, start), max(high, start + duration))
+        return {name: high - low for name, (low, high) in bounds.items()}
+
+
+class Tracer:
+    """Collects per-command traces, keeps latency percentiles and exports JSONL"""
+
+    STAGES = ['capture', 'stt', 'routing', 'handler', 'llm', 'tts']
+
+    def __init__(self, path=None, history=1000):
+        self.path = path
+        self.stage_samples = {}
+        self.history = history
+        self.traces_finished = 0
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def start(self, source, origin=None):
+        return Trace(self, next(self._ids), source, origin or time.perf_counter())
+
+    def current(self):
+        """Trace being processed on this thread, if any"""
+        return getattr(self._local, 'trace', None)
+
+    def activate(self, trace):
+        self._local.trace = trace
+
+    def deactivate(self):
+        self._local.trace = None
+
+    def finish(self, trace):
+        stages = trace.stage_durations()
+        stages['total'] = time.perf_counter() - trace.origin
+        if trace.first_audio is not None:
+            stages['first_audio'] = trace.first_audio
+        with self._lock:
+            self.traces_finished += 1
+            for name, duration in stages.items():
+                self.stage_samples.setdefault(name, deque(maxlen=self.history)).append(duration)
+        if self.path:
+            self._export(trace, stages)
+
+    def _export(self, trace, stages):
+        record = {
+            'trace_id': trace.trace_id,
+            'source': trace.source,
+            'started_at': trace.started_at,
+            'command': trace.command,
+            'intent': trace.intent,
+            'stages_ms': {name: round(duration * 1000, 3) for name, duration in stages.items()},
+            'spans': [
+                dict(name=name, start_ms=round(start * 1000, 3), duration_ms=round(duration * 1000, 3), **attrs)
+                for name, start, duration, attrs in trace.spans
+            ]
+        }
+        try:
+            with self._lock:
+                with open(self.path, 'a') as f:
+                    f.write(json.dumps(record) + "\n")
+        except Exception as e:
+            logging.error(f"Error exporting trace: {e}")
+
+    def percentiles(self, stage, points=(50, 95, 99)):
+        with self._lock:
+            values = sorted(self.stage_samples.get(stage, ()))
+        if not values:
+            return None
+        return [values[min(len(values) - 1, int(len(values) * point / 100))] for point in points]
+
+    def summary(self):
+        """Lines of 'stage: p50 / p95 / p99' for every stage seen so far"""
+        lines = []
+        for stage in self.STAGES + ['first_audio', 'total']:
+            result = self.percentiles(stage)
+            if result:
+                p50, p95, p99 = (value * 1000 for value in result)
+                lines.append(f"{stage}: {p50:.1f} / {p95:.1f} / {p99:.1f} ms "
+                             f"(n={len(self.stage_samples[stage])})")
+        return lines
+
+
+DiagnosticProbe = namedtuple('DiagnosticProbe', ['name', 'check', 'timeout'])
+
+
+class HTTPClient:
+    """Connection-pooled keep-alive HTTP session shared by outbound calls
+
+    Connection failures are retried with backoff for every method. Read
+    errors and 502/503/504 responses are retried only for idempotent
+    GET/HEAD/OPTIONS requests: a POST such as Ollama's /api/generate is sent
+    once it has connected, so a 503 from a busy server reaches the caller.
+    Other errors are raised to the caller as usual requests exceptions.
+    """
+
+    def __init__(self, pool_size=10, timeout=(3.05, 15), retries=2, backoff=0.3):
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                      backoff_factor=backoff, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                              max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Return the process-wide HTTP client, sized from JARVIS_HTTP_POOL_SIZE"""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = HTTPClient(
+                pool_size=int(os.getenv('JARVIS_HTTP_POOL_SIZE', '10')),
+                retries=int(os.getenv('JARVIS_HTTP_RETRIES', '2'))
+            )
+        return _http_client
+
+
+def benchmark_http_pool(requests_count=500, payload_words=50):
+    """Compare fresh-connection requests against the pooled client on a local server"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    body = json.dumps({"response": " ".join(["word"] * payload_words)}).encode()
+
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/generate"
+    payload = {"model": "llama3", "prompt": "benchmark", "stream": False}
+    client = HTTPClient(pool_size=2)
+    try:
+        start = time.perf_counter()
+        for _ in range(requests_count):
+            requests.post(url, json=payload, timeout=5).json()
+        fresh_us = (time.perf_counter() - start) / requests_count * 1e6
+
+        start = time.perf_counter()
+        for _ in range(requests_count):
+            client.post(url, json=payload).json()
+        pooled_us = (time.perf_counter() - start) / requests_count * 1e6
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+    print(f"fresh connection: {fresh_us:8.1f} us/request")
+    print(f"pooled keep-alive: {pooled_us:8.1f} us/request ({fresh_us - pooled_us:.1f} us saved per call)")
+    return fresh_us, pooled_us
+
+
+class LLMBackend:
+    """Interface shared by the language model services JARVIS can talk to
+
+    generate() and stream() raise on failure; the engine decides how to
+    fall back. connect() selects a model and reports whether it is usable.
+    """
+
+    name = "None"
+
+    def __init__(self):
+        self.model_name = None
+
+    def connect(self):
+        raise NotImplementedError
+
+    def generate(self, prompt):
+        raise NotImplementedError
+
+    def stream(self, prompt):
+        """Yield the response in chunks; backends without streaming yield it whole"""
+        yield self.generate(prompt)
+
+    def health(self, timeout=2.0):
+        """Return (ok, detail) without spending a generation request"""
+        return False, "Not connected"
+
+    def list_models(self):
+        return []
+
+    def prime(self, prefix):
+        """Hint that prompts will start with prefix so the backend can cache it"""
+
+    def warm_up(self, prefix=None):
+        """Load the model ahead of the first query; called on a background thread"""
+
+    def routing_summary(self):
+        """Per-model routing statistics for diagnostics, if the backend routes"""
+        return []
+
+
+class ModelRouter:
+    """Ranks interchangeable models by rolling latency and error rate
+
+    Healthy models come first by fastest median latency, then healthy models
+    that have never succeeded, then unhealthy models: those whose recent
+    error rate exceeds max_error_rate or whose last max_consecutive_failures
+    calls all failed. Every explore_every-th ranking puts the healthy model
+    that has gone longest without a call first, so latencies stay current
+    for the models that are not winning. Outcomes older than decay seconds
+    are forgotten so a failing model is eventually retried. Callers should
+    only route to models that have already answered once (see
+    GeminiBackend.connect), so every model starts with a latency sample.
+    """
+
+    def __init__(self, models, window=50, max_error_rate=0.5, max_consecutive_failures=2,
+                 min_samples=5, decay=300.0, explore_every=20):
+        self.models = list(models)
+        self.explore_every = explore_every
+        self.rankings = 0
+        self.last_used = {model: 0.0 for model in self.models}
+        self.max_error_rate = max_error_rate
+        self.max_consecutive_failures = max_consecutive_failures
+        self.min_samples = min_samples
+        self.decay = decay
+        self.latencies = {model: deque(maxlen=window) for model in self.models}
+        self.outcomes = {model: deque(maxlen=window) for model in self.models}
+        self._lock = threading.Lock()
+
+    def retain(self, models):
+        """Stop routing to every model not in models"""
+        with self._lock:
+            self.models = [model for model in self.models if model in models]
+
+    def record(self, model, latency, ok):
+        with self._lock:
+            self.last_used[model] = time.monotonic()
+            self.outcomes[model].append((time.monotonic(), ok))
+            if ok:
+                self.latencies[model].append(latency)
+
+    def _recent(self, model):
+        cutoff = time.monotonic() - self.decay
+        return [ok for stamp, ok in self.outcomes[model] if stamp >= cutoff]
+
+    def error_rate(self, model):
+        recent = self._recent(model)
+        return 1 - sum(recent) / len(recent) if recent else 0.0
+
+    def healthy(self, model):
+        recent = self._recent(model)
+        if not recent:
+            return True
+        trailing = recent[-self.max_consecutive_failures:]
+        if len(trailing) == self.max_consecutive_failures and not any(trailing):
+            return False
+        return 1 - sum(recent) / len(recent) <= self.max_error_rate
+
+    def percentile(self, model, pct):
+        samples = sorted(self.latencies[model])
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+    def deadline(self, model):
+        """p95 latency once enough samples exist, otherwise None (no hedging)"""
+        if len(self.latencies[model]) < self.min_samples:
+            return None
+        return self.percentile(model, 95)
+
+    def ranked(self):
+        with self._lock:
+            self.rankings += 1
+
+            def rank(item):
+                index, model = item
+                if not self.healthy(model):
+                    return (2, index, 0)
+                median = self.percentile(model, 50)
+                return (0, median, index) if median is not None else (1, index, 0)
+            order = [model for _, model in sorted(enumerate(self.models), key=rank)]
+            if self.rankings % self.explore_every == 0:
+                candidates = [model for model in order if self.healthy(model)]
+                if len(candidates) > 1:
+                    stalest = min(candidates, key=lambda model: self.last_used[model])
+                    order.remove(stalest)
+                    order.insert(0, stalest)
+            return order
+
+    def summary(self):
+        lines = []
+        with self._lock:
+            for model in self.models:
+                median = self.percentile(model, 50)
+                p95 = self.percentile(model, 95)
+                if median is None and not self.outcomes[model]:
+                    lines.append(f"{model}: untried")
+                    continue
+                timing = f"p50 {median * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms" if median is not None else "no successes"
+                lines.append(f"{model}: {timing}, errors {self.error_rate(model):.0%} "
+                             f"over {len(self.outcomes[model])} calls")
+        return lines
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini through google.generativeai
+
+    Every model version that initializes is kept and each query goes to the
+    fastest healthy one according to a ModelRouter. With hedging enabled
+    (hedge=True or JARVIS_HEDGE_REQUESTS=1) a backup request is sent to the
+    runner-up once the primary passes its p95 latency; whichever answers
+    first wins and the loser is discarded.
+    """
+
+    name = "Gemini"
+    MODEL_VERSIONS = ['gemini-1.5-flash', 'gemini-1.0-pro', 'gemini-pro']
+
+    def __init__(self, api_key=None, hedge=None):
+        super().__init__()
+        self.api_key = api_key
+        self.model = None
+        self.models = OrderedDict()
+        self.router = None
+        self.connected = False
+        self.hedge = os.getenv('JARVIS_HEDGE_REQUESTS', '0') == '1' if hedge is None else hedge
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="gemini-hedge")
+
+    def connect(self):
+        """Initialize Gemini AI with robust error handling"""
+        try:
+            load_dotenv()
+            api_key = self.api_key or os.getenv('GEMINI_API_KEY')
+            
+            if not api_key:
+                logging.warning("Gemini API key not found in .env file")
+                return False
+                
+            genai.configure(api_key=api_key)
+            
+            # Keep every model version that initializes so queries can be routed between them
+            self.models = OrderedDict()
+            
+            for version in self.MODEL_VERSIONS:
+                try:
+                    self.models[version] = genai.GenerativeModel(version)
+                except Exception as e:
+                    logging.warning(f"Failed to initialize {version}: {e}")
+                    continue
+            
+            if not self.models:
+                raise Exception("No compatible Gemini model found")
+            self.router = ModelRouter(self.models)
+
+            # Test every model at once; only models that answer receive user traffic
+            tests = OrderedDict((version, self._executor.submit(
+                self._call, version, lambda model: model.generate_content("Test connection").text))
+                for version in self.models)
+            for version, test in tests.items():
+                try:
+                    if not test.result():
+                        raise Exception("Empty response from Gemini")
+                except Exception as e:
+                    logging.error(f"Gemini test failed on {version}: {e}")
+                    del self.models[version]
+            self.connected = bool(self.models)
+            if self.connected:
+                self.router.retain(self.models)
+                # The first configured model that answers names the backend, which keeps cache keys stable
+                self.model_name, self.model = next(iter(self.models.items()))
+                logging.info(f"Gemini AI connected successfully ({', '.join(self.models)})")
+
+        except Exception as e:
+            logging.error(f"Gemini setup error: {e}")
+            self.connected = False
+        return self.connected
+
+    def generate(self, prompt):
+        return self._route(lambda model: model.generate_content(prompt).text)
+
+    def stream(self, prompt):
+        # Routing and hedging act on time to first chunk; the winner streams the rest
+        first, rest = self._route(lambda model: self._open_stream(model, prompt),
+                                  discard=lambda opened: opened[1].close())
+        if first:
+            yield first
+        yield from rest
+
+    @staticmethod
+    def _open_stream(model, prompt):
+        chunks = (chunk.text for chunk in model.generate_content(prompt, stream=True))
+        return next(chunks, ""), chunks
+
+    def _call(self, version, fn):
+        """Run fn against one model, recording its latency and outcome"""
+        started = time.perf_counter()
+        try:
+            result = fn(self.models[version])
+        except Exception:
+            self.router.record(version, time.perf_counter() - started, False)
+            raise
+        self.router.record(version, time.perf_counter() - started, True)
+        return result
+
+    def _route(self, fn, discard=None):
+        """Run fn on the fastest healthy model, hedging on the runner-up or failing over down the ranking"""
+        ranked = self.router.ranked()
+        primary, fallbacks = ranked[0], ranked[1:]
+        deadline = self.router.deadline(primary) if self.hedge and fallbacks else None
+
+        if deadline is None:
+            return self._failover(ranked, fn)
+
+        backup = fallbacks[0]
+        first = self._executor.submit(self._call, primary, fn)
+        try:
+            return first.result(timeout=deadline)
+        except concurrent.futures.TimeoutError:
+            logging.info(f"{primary} passed its p95 of {deadline * 1000:.0f} ms; hedging on {backup}")
+        except Exception as e:
+            logging.warning(f"{primary} failed ({e}); failing over")
+            return self._failover(fallbacks, fn)
+
+        self.hedged += 1
+        pending = {first: primary, self._executor.submit(self._call, backup, fn): backup}
+        error = None
+        while pending:
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                version = pending.pop(future)
+                if future.exception() is None:
+                    for loser in pending:
+                        self._cancel(loser, discard)
+                    if version != primary:
+                        self.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+        if len(fallbacks) > 1:
+            logging.warning(f"{primary} and {backup} failed ({error}); failing over")
+            return self._failover(fallbacks[1:], fn)
+        raise error
+
+    def _failover(self, versions, fn):
+        """Try each model in turn, raising the last error if every one fails"""
+        error = None
+        for version in versions:
+            try:
+                return self._call(version, fn)
+            except Exception as e:
+                error = e
+                logging.warning(f"{version} failed ({e})")
+        raise error
+
+    @staticmethod
+    def _cancel(future, discard):
+        """Cancel a losing request, or throw its result away once it arrives"""
+        if not future.cancel() and discard:
+            future.add_done_callback(lambda f: f.exception() is None and discard(f.result()))
+
+    def health(self, timeout=2.0):
+        if not self.model:
+            return False, "No Gemini model selected"
+        return self.connected, f"{self.model_name} {'connected' if self.connected else 'unreachable'}"
+
+    def list_models(self):
+        return [model.name for model in genai.list_models()
+                if 'generateContent' in model.supported_generation_methods]
+
+    def routing_summary(self):
+        if not self.router:
+            return []
+        lines = self.router.summary()
+        if self.hedge:
+            lines.append(f"Hedged requests: {self.hedged} ({self.hedge_wins} won by the backup)")
+        return lines
+
+
+class OllamaBackend(LLMBackend):
+    """Local models served by Ollama's HTTP API
+
+    Responses are always streamed. stall_timeout bounds the gap between
+    chunks rather than the whole answer, so a slow model that keeps
+    producing tokens is healthy and only a stalled stream fails.
+
+    Every request carries keep_alive so the model stays resident between
+    commands. Prompts that start with a primed prefix (the JARVIS persona)
+    send only the remainder together with the context Ollama returned for
+    that prefix, so the persona is not evaluated again on every query. The
+    prefix is primed on its own, with no added instruction, so the reused
+    context is exactly the persona and the model's first reply to it.
+    """
+
+    name = "Ollama"
+
+    def __init__(self, url=None, model=None, stall_timeout=15, connect_timeout=3.05, http=None,
+                 keep_alive=None, reuse_context=True):
+        super().__init__()
+        self.http = http or get_http_client()
+        self.base_url = (url or os.getenv('OLLAMA_URL', 'http://localhost:11434')).rstrip('/')
+        self.model_name = model or os.getenv('OLLAMA_MODEL', 'llama3')
+        self.stall_timeout = stall_timeout
+        self.connect_timeout = connect_timeout
+        keep_alive = os.getenv('OLLAMA_KEEP_ALIVE', '30m') if keep_alive is None else keep_alive
+        # Ollama takes either a duration string ("30m") or a number of seconds (-1 keeps it loaded forever)
+        self.keep_alive = int(keep_alive) if str(keep_alive).lstrip('-').isdigit() else keep_alive
+        self.reuse_context = reuse_context
+        self._prefix_contexts = {}  # (model, prefix) -> context returned by Ollama
+        self._priming = set()
+        self._lock = threading.Lock()
+
+    def connect(self):
+        ok, detail = self.health(timeout=3)
+        logging.info(f"Ollama connection: {detail}")
+        return ok
+
+    def generate(self, prompt):
+        return "".join(self.stream(prompt))
+
+    def _payload(self, prompt, stream):
+        payload = {
+            "model": self.model_name,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": {"temperature": 0.7}
+        }
+        if self.reuse_context:
+            with self._lock:
+                primed = [(prefix, context) for (model, prefix), context in self._prefix_contexts.items()
+                          if model == self.model_name and prompt.startswith(prefix)]
+            if primed:
+                prefix, context = max(primed, key=lambda item: len(item[0]))
+                payload["prompt"] = prompt[len(prefix):].lstrip()
+                payload["context"] = context
+        return payload
+
+    def stream(self, prompt):
+        """Yield tokens from Ollama's newline-delimited JSON stream"""
+        with self.http.post(
+            f"{self.base_url}/api/generate",
+            json=self._payload(prompt, stream=True),
+            stream=True,
+            timeout=(self.connect_timeout, self.stall_timeout)
+        ) as response:
+            response.raise_for_status()
+            # chunk_size=None hands over each chunk as it arrives instead of waiting for a full buffer
+            for line in response.iter_lines(chunk_size=None):
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise RuntimeError(f"Ollama error: {data['error']}")
+                if data.get("response"):
+                    yield data["response"]
+                if data.get("done"):
+                    break
+
+    def prime(self, prefix):
+        """Evaluate prefix once in the background and keep the returned context"""
+        if not self.reuse_context or not prefix:
+            return
+        key = (self.model_name, prefix)
+        with self._lock:
+            if key in self._prefix_contexts or key in self._priming:
+                return
+            self._priming.add(key)
+        threading.Thread(target=self._prime, args=(key,), daemon=True).start()
+
+    def _prime(self, key):
+        model, prefix = key
+        try:
+            response = self.http.post(
+                f"{self.base_url}/api/generate",
+                json={
+                    "model": model,
+                    "prompt": prefix,
+                    "stream": False,
+                    "keep_alive": self.keep_alive,
+                    "options": {"temperature": 0.7, "num_predict": 32}
+                },
+                timeout=(self.connect_timeout, 120)
+            )
+            response.raise_for_status()
+            context = response.json().get("context")
+            if context:
+                with self._lock:
+                    self._prefix_contexts[key] = context
+                logging.info(f"Ollama primed {len(context)} context tokens for {model}")
+        except Exception as e:
+            logging.warning(f"Ollama priming failed: {e}")
+        finally:
+            with self._lock:
+                self._priming.discard(key)
+
+    def warm_up(self, prefix=None):
+        """Load the model into memory, then prime the persona prefix"""
+        started = time.perf_counter()
+        try:
+            # An empty prompt only loads the model
+            response = self.http.post(
+                f"{self.base_url}/api/generate",
+                json={"model": self.model_name, "prompt": "", "stream": False, "keep_alive": self.keep_alive},
+                timeout=(self.connect_timeout, 120)
+            )
+            response.raise_for_status()
+            logging.info(f"Ollama warm-up loaded {self.model_name} in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            logging.warning(f"Ollama warm-up failed: {e}")
+            return
+        if prefix and self.reuse_context:
+            key = (self.model_name, prefix)
+            with self._lock:
+                if key in self._prefix_contexts or key in self._priming:
+                    return
+                self._priming.add(key)
+            self._prime(key)
+
+    def health(self, timeout=2.0):
+        try:
+            models = self.list_models(timeout=timeout)
+        except Exception as e:
+            return False, f"Ollama unreachable at {self.base_url}: {e}"
+        if not any(name.split(':')[0] == self.model_name.split(':')[0] for name in models):
+            return False, f"Model {self.model_name} not pulled (available: {', '.join(models) or 'none'})"
+        return True, f"{self.model_name} available at {self.base_url}"
+
+    def list_models(self, timeout=5):
+        response = self.http.get(f"{self.base_url}/api/tags", timeout=timeout)
+        response.raise_for_status()
+        return [model['name'] for model in response.json().get('models', [])]
+
+
+def benchmark_ollama_warm_start(queries=8, load_time=1.0, ms_per_token=10.0):
+    """Compare cold, stateless Ollama requests against keep-alive, warm-up and context reuse
+
+    Runs against a local stand-in for the Ollama API that charges load_time
+    whenever the model is not resident and ms_per_token for every prompt
+    token it has to evaluate (tokens passed back as context are free).
+    "Before" unloads the model after every request, as happens once Ollama's
+    default five-minute keep-alive lapses between commands.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    state = {'loaded_until': 0.0}
+
+    def keep_alive_seconds(value):
+        if isinstance(value, (int, float)):
+            return float('inf') if value < 0 else float(value)
+        units = {'s': 1, 'm': 60, 'h': 3600}
+        return float(value[:-1]) * units[value[-1]] if value and value[-1] in units else 300.0
+
+    class StandInOllama(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            if time.monotonic() > state['loaded_until']:
+                time.sleep(load_time)
+            prompt = payload.get("prompt", "")
+            time.sleep(ConversationContext.estimate_tokens(prompt) * ms_per_token / 1000)
+            context = list(payload.get("context", [])) + list(range(ConversationContext.estimate_tokens(prompt)))
+            state['loaded_until'] = time.monotonic() + keep_alive_seconds(payload.get("keep_alive", "5m"))
+
+            if payload.get("stream"):
+                lines = [{"response": word + " ", "done": False} for word in "Affirmative, all systems nominal.".split()]
+                lines.append({"response": "", "done": True, "context": context})
+                body = "".join(json.dumps(line) + "\n" for line in lines).encode()
+            else:
+                body = json.dumps({"response": "At your service, Sir." if prompt else "", "done": True,
+                                   "context": context}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    persona = ("Respond as JARVIS from Iron Man to Sir. "
+               "Be concise (1-2 sentences), technical, and slightly witty.")
+    questions = ["how far is the moon", "what is dark matter", "explain quantum tunnelling",
+                 "who built the first computer", "why is the sky blue", "what is a neutron star"]
+
+    def run(backend, warm):
+        state['loaded_until'] = 0.0
+        if warm:
+            backend.warm_up(persona)  # runs in the background while the GUI boots
+        latencies = []
+        for i in range(queries):
+            started = time.perf_counter()
+            "".join(backend.stream(f"{persona}\nQuestion: {questions[i % len(questions)]}"))
+            latencies.append((time.perf_counter() - started) * 1000)
+        return latencies
+
+    client = HTTPClient(pool_size=2)
+    try:
+        before = run(OllamaBackend(url=url, http=client, keep_alive=0, reuse_context=False), warm=False)
+        after = run(OllamaBackend(url=url, http=client, keep_alive="30m"), warm=True)
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+    for label, latencies in (("before (cold, stateless)", before), ("after (keep-alive, warm, context)", after)):
+        print(f"{label:34} first {latencies[0]:7.0f} ms | later avg {sum(latencies[1:]) / len(latencies[1:]):7.0f} ms")
+    return before, after
+
+
+def compare_ollama_priming(questions=("how far is the moon", "what is dark matter", "tell me a joke")):
+    """Ask a real Ollama model the same questions with and without the primed persona context
+
+    Temperature still applies, so replies will not match word for word; the
+    point is to confirm primed replies keep the persona and answer the
+    question rather than echo the priming turn.
+    """
+    persona = ("Respond as JARVIS from Iron Man to Sir. "
+               "Be concise (1-2 sentences), technical, and slightly witty.")
+    plain = OllamaBackend(reuse_context=False)
+    primed = OllamaBackend()
+    ok, detail = primed.health()
+    if not ok:
+        print(detail)
+        return None
+    primed.warm_up(persona)
+    results = []
+    for question in questions:
+        prompt = f"{persona}\nQuestion: {question}"
+        results.append((question, plain.generate(prompt).strip(), primed.generate(prompt).strip()))
+        print(f"Q: {question}\n  unprimed: {results[-1][1]}\n  primed:   {results[-1][2]}")
+    return results
+
+
+class FakeBackend(LLMBackend):
+    """Deterministic offline backend for load testing and CI"""
+
+    name = "Fake"
+    TEMPLATES = [
+        "According to my databases, {user}, {question} is well within operational parameters.",
+        "My analysis indicates that {question} requires no further action, {user}.",
+        "The answer to your query about {question} is affirmative, {user}. Shall I elaborate?"
+    ]
+
+    def __init__(self, latency=0.0, token_delay=0.0, model="fake-jarvis"):
+        super().__init__()
+        self.latency = latency
+        self.token_delay = token_delay
+        self.model_name = model
+        self.calls = 0
+
+    def connect(self):
+        return True
+
+    def _reply(self, prompt):
+        question = prompt.split("Question:")[-1].strip().rstrip("?.!") or "that"
+        user = re.search(r"to (.+?)\. ", prompt)
+        template = self.TEMPLATES[zlib.crc32(question.encode()) % len(self.TEMPLATES)]
+        return template.format(question=question, user=user.group(1) if user else "Sir")
+
+    def generate(self, prompt):
+        self.calls += 1
+        time.sleep(self.latency)
+        return self._reply(prompt)
+
+    def stream(self, prompt):
+        self.calls += 1
+        time.sleep(self.latency)
+        words = self._reply(prompt).split(" ")
+        for i, word in enumerate(words):
+            time.sleep(self.token_delay)
+            yield word if i == len(words) - 1 else word + " "
+
+    def health(self, timeout=2.0):
+        return True, "Deterministic local backend"
+
+    def list_models(self):
+        return [self.model_name]
+
+
+class CircuitBreaker:
+    """Per-backend circuit breaker with half-open recovery
+
+    Opens after failure_threshold failures within window seconds. While open
+    callers get the offline fallback immediately; after reset_timeout one
+    request is let through as a probe, which closes the circuit on success
+    or reopens it on failure.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, name, failure_threshold=3, window=60.0, reset_timeout=30.0, on_change=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.on_change = on_change
+        self.state = self.CLOSED
+        self.failures = deque()
+        self.opened_at = None
+        self.probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a request may go to the backend right now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            changed = False
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                changed = self._set_state(self.HALF_OPEN)
+            allowed = not self.probe_in_flight
+            self.probe_in_flight = True
+        self._notify(changed)
+        return allowed
+
+    def record_success(self):
+        with self._lock:
+            self.failures.clear()
+            self.probe_in_flight = False
+            changed = self._set_state(self.CLOSED)
+        self._notify(changed)
+
+    def record_failure(self):
+        now = time.monotonic()
+        with self._lock:
+            self.probe_in_flight = False
+            self.failures.append(now)
+            while self.failures and now - self.failures[0] > self.window:
+                self.failures.popleft()
+            changed = False
+            if self.state == self.HALF_OPEN or len(self.failures) >= self.failure_threshold:
+                changed = self._open(now)
+        self._notify(changed)
+
+    def trip(self):
+        """Open the circuit immediately, e.g. when the initial connection fails"""
+        with self._lock:
+            changed = self._open(time.monotonic())
+        self._notify(changed)
+
+    def retry_in(self):
+        """Seconds until the next half-open probe is allowed"""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def describe(self):
+        if self.state == self.OPEN:
+            return f"circuit open, retry in {self.retry_in():.0f}s"
+        return f"circuit {self.state}"
+
+    def _open(self, now):
+        self.opened_at = now
+        self.failures.clear()
+        changed = self._set_state(self.OPEN)
+        if changed:
+            logging.warning(f"{self.name} circuit opened; serving offline fallback for {self.reset_timeout:.0f}s")
+        return changed
+
+    def _set_state(self, state):
+        if self.state == state:
+            return False
+        self.state = state
+        return True
+
+    def _notify(self, changed):
+        if changed:
+            logging.info(f"{self.name} circuit {self.state}")
+            if self.on_change:
+                self.on_change(self.state)
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls into one in-flight execution
+
+    The first caller for a key runs the call; callers arriving while it is
+    in flight wait for and share its result or exception. stream() does the
+    same for generators, replaying chunks to every waiter as they arrive.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._streams = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def _join(self, table, key):
+        with self._lock:
+            flight = table.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return flight, False
+            flight = {'done': threading.Condition(self._lock), 'finished': False,
+                      'result': None, 'error': None, 'chunks': []}
+            table[key] = flight
+            self.executed += 1
+            return flight, True
+
+    def _finish(self, table, key, flight):
+        with self._lock:
+            flight['finished'] = True
+            table.pop(key, None)
+            flight['done'].notify_all()
+
+    def do(self, key, fn):
+        flight, leader = self._join(self._calls, key)
+        if leader:
+            try:
+                flight['result'] = fn()
+            except Exception as e:
+                flight['error'] = e
+            finally:
+                self._finish(self._calls, key, flight)
+        else:
+            with self._lock:
+                flight['done'].wait_for(lambda: flight['finished'])
+        if flight['error'] is not None:
+            raise flight['error']
+        return flight['result']
+
+    def stream(self, key, fn):
+        flight, leader = self._join(self._streams, key)
+        if leader:
+            try:
+                for chunk in fn():
+                    with self._lock:
+                        flight['chunks'].append(chunk)
+                        flight['done'].notify_all()
+                    yield chunk
+            except Exception as e:
+                flight['error'] = e
+                raise
+            finally:
+                self._finish(self._streams, key, flight)
+            return
+
+        sent = 0
+        while True:
+            with self._lock:
+                flight['done'].wait_for(lambda: len(flight['chunks']) > sent or flight['finished'])
+                chunks = flight['chunks'][sent:]
+                finished = flight['finished']
+            for chunk in chunks:
+                yield chunk
+            sent += len(chunks)
+            if finished and sent == len(flight['chunks']):
+                break
+        if flight['error'] is not None:
+            raise flight['error']
+
+    def stats(self):
+        with self._lock:
+            return {'executed': self.executed, 'coalesced': self.coalesced,
+                    'in_flight': len(self._calls) + len(self._streams)}
+
+
+LLM_BACKENDS = {
+    'gemini': GeminiBackend,
+    'ollama': OllamaBackend,
+    'fake': FakeBackend
+}
+
+
+def create_backend(name):
+    """Build an LLM backend from its config name (gemini, ollama or fake)"""
+    try:
+        return LLM_BACKENDS[name.lower()]()
+    except KeyError:
+        raise ValueError(f"Unknown LLM backend '{name}'. Choose from: {', '.join(LLM_BACKENDS)}")
+
+
+class JarvisEngine:
+    """Headless command-processing core: routing, memory, AI and app launching"""
+
+    SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+    MEMORY_WRITE_FAILED = "I couldn't save that to memory, Sir. Please check the memory file."
+
+    def __init__(self, memory_file='jarvis_memory.json', streaming=True,
+                 cache_file='jarvis_cache.json', cache_size=256, cache_ttl=3600,
+                 metrics_interval=2.0, trace_file='jarvis_traces.jsonl', backend=None,
+                 context_budget=1024):
+        self.user_name = "Sir"  # Default name
+        self.system_os = platform.system().lower()
+        self.running = True
+        self.ai_enabled = False
+        self.ai_status = "Offline"
+        self.ai_ready = threading.Event()
+        self.ai_ready.set()
+        self.ai_probe_timeout = 10
+        if not isinstance(backend, LLMBackend):
+            backend = create_backend(backend or os.getenv('JARVIS_LLM_BACKEND', 'gemini'))
+        self.backend = backend
+        self.breaker = CircuitBreaker(backend.name, on_change=self._on_breaker_change)
+        self.inflight = SingleFlight()
+        self.context = ConversationContext(token_budget=context_budget, summarizer=self._summarize_context)
+        self.memory_file = memory_file
+        self.memory_journal = MemoryJournal(memory_file)
+        self.streaming = streaming
+        self.stream_stats = deque(maxlen=100)
+        self.response_cache = ResponseCache(max_entries=cache_size, ttl=cache_ttl, path=cache_file)
+        self.metrics = MetricsSampler(interval=metrics_interval)
+        self.tracer = Tracer(path=trace_file)
+        self.metrics.start()
+        self.weather_api_key = os.getenv('WEATHER_API_KEY')
+        self.wolfram_app_id = os.getenv('WOLFRAM_APP_ID')
+
+        # Attached front-ends (chat displays, speech output, exit hooks)
+        self.displays = []
+        self._replies = threading.local()  # per-thread reply capture for handle_command
+        self.speech = None
+        self.exit_handlers = []
+        self.status_handlers = []
+        self.probes = OrderedDict()
+
+        # Initialize user memory system
+        self.user_memory = {
+            'personal_info': {},  # For storing personal information
+            'custom_lists': {},   # For user-created lists
+            'custom_dicts': {}     # For user-created dictionaries
+        }
+
+        # Try to load saved memory
+        self.load_memory()
+
+        self.setup_responses()
+        self.setup_applications()
+        self.setup_intents()
+        self.setup_probes()
+
+    def attach_display(self, display, stream=None):
+        """Attach a callable(speaker, message, tag) that renders chat messages
+
+        stream, if given, is a callable(speaker, chunk, done) used to render
+        replies incrementally while they are being generated.
+        """
+        self.displays.append((display, stream))
+
+    def attach_speech(self, speech):
+        """Attach a callable(text, on_start=None, on_done=None) that speaks replies aloud
+
+        on_start() and on_done(completed) let the engine time the TTS stage.
+        """
+        self.speech = speech
+
+    def on_status(self, handler):
+        """Register a callable() invoked when the AI connection status changes"""
+        self.status_handlers.append(handler)
+
+    def on_exit(self, handler):
+        """Register a callable(delay_ms) invoked when the user asks to quit"""
+        self.exit_handlers.append(handler)
+
+    def update_chat(self, speaker, message, tag=None):
+        """Send a message to every attached display"""
+        self._capture_reply(speaker, message)
+        for display, _ in self.displays:
+            display(speaker, message, tag)
+
+    def _capture_reply(self, speaker, message):
+        replies = getattr(self._replies, 'messages', None)
+        if replies is not None and speaker.upper() == "JARVIS":
+            replies.append(message)
+
+    def jarvis_speak(self, text):
+        """Display a reply and hand it to the speech front-end, if any"""
+        self.update_chat("JARVIS", text)
+        if self.speech:
+            self._speak(text)
+
+    def _speak(self, text):
+        trace = self.tracer.current()
+        if trace is None:
+            self.speech(text)
+            return
+
+        trace.hold()
+        queued = time.perf_counter()
+        timing = {}
+
+        def on_start():
+            timing['start'] = time.perf_counter()
+            trace.mark_first_audio()
+
+        def on_done(completed):
+            start = timing.get('start', queued)
+            trace.add_span("tts", start, time.perf_counter(), queued_ms=round((start - queued) * 1000, 3),
+                           completed=completed)
+            trace.release()
+
+        self.speech(text, on_start=on_start, on_done=on_done)
+
+    def jarvis_stream(self, chunks):
+        """Display a reply as it arrives and speak each sentence once it is complete"""
+        started = time.perf_counter()
+        first_token = first_audio = None
+        reply = []
+        pending = ""
+
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if first_token is None:
+                first_token = time.perf_counter() - started
+            reply.append(chunk)
+            for _, stream in self.displays:
+                if stream:
+                    stream("JARVIS", chunk, False)
+
+            sentences = self.SENTENCE_END.split(pending + chunk)
+            pending = sentences.pop()
+            for sentence in sentences:
+                if self.speech and sentence.strip():
+                    if first_audio is None:
+                        first_audio = time.perf_counter() - started
+                    self._speak(sentence.strip())
+
+        if self.speech and pending.strip():
+            if first_audio is None:
+                first_audio = time.perf_counter() - started
+            self._speak(pending.strip())
+
+        text = "".join(reply)
+        self._capture_reply("JARVIS", text)
+        for display, stream in self.displays:
+            if stream:
+                stream("JARVIS", "", True)
+            else:
+                display("JARVIS", text, None)
+
+        total = time.perf_counter() - started
+        self.stream_stats.append({'first_token': first_token, 'first_audio': first_audio, 'total': total})
+        logging.info(
+            f"Streamed reply: first token {first_token or 0:.3f}s, "
+            f"first audio {first_audio or 0:.3f}s, total {total:.3f}s"
+        )
+        return text
+
+    def request_exit(self, delay_ms=1000):
+        """Stop the engine and let front-ends tear themselves down"""
+        self.running = False
+        self.metrics.stop()
+        self.response_cache.save()
+        self.save_memory()
+        for handler in self.exit_handlers:
+            handler(delay_ms)
+
+    def handle_command(self, command):
+        """Process a command programmatically and return JARVIS's replies"""
+        # Replies are collected per thread, so concurrent callers only see their own
+        replies = self._replies.messages = []
+        try:
+            self.process_voice_command(command.strip().lower())
+        finally:
+            self._replies.messages = None
+        return replies
+
+    def start_ai_probe(self):
+        """Select a model and test the AI backend on a background thread"""
+        self.ai_ready.clear()
+        self.set_ai_status("Connecting")
+        threading.Thread(target=self._run_ai_probe, daemon=True).start()
+
+    def _run_ai_probe(self):
+        try:
+            self.setup_ai()
+        finally:
+            if self.ai_enabled:
+                self.breaker.record_success()
+            else:
+                self.breaker.trip()
+            self.ai_ready.set()
+            self.set_ai_status("Online" if self.ai_enabled else "Offline")
+        if self.ai_enabled:
+            threading.Thread(target=self.backend.warm_up, args=(self._persona(),), daemon=True).start()
+
+    def set_ai_status(self, status):
+        if status == self.ai_status:
+            return
+        self.ai_status = status
+        for handler in self.status_handlers:
+            handler()
+
+    def _on_breaker_change(self, state):
+        if self.ai_ready.is_set():
+            self.set_ai_status({CircuitBreaker.CLOSED: "Online", CircuitBreaker.OPEN: "Offline",
+                                CircuitBreaker.HALF_OPEN: "Recovering"}[state])
+
+    def await_ai(self):
+        """Wait for a pending connection probe, returning whether a request may go to the backend"""
+        if not self.ai_ready.is_set():
+            logging.info(f"Waiting for {self.backend.name} connection probe")
+            if not self.ai_ready.wait(self.ai_probe_timeout):
+                return False
+        if not self.breaker.allow():
+            return False
+        if not self.ai_enabled:
+            # Half-open probe for a backend that never connected: retry the connection itself
+            self.setup_ai()
+            if not self.ai_enabled:
+                self.breaker.record_failure()
+                return False
+        return True
+
+    def _await_model_name(self):
+        """Cache keys include the model name, which some backends only learn from the connection probe"""
+        if self.backend.model_name is None and not self.ai_ready.is_set():
+            self.ai_ready.wait(self.ai_probe_timeout)
+
+    def setup_ai(self):
+        """Connect the configured AI backend"""
+        try:
+            self.ai_enabled = self.backend.connect()
+        except Exception as e:
+            logging.error(f"{self.backend.name} setup error: {e}")
+            self.ai_enabled = False
+
+    def setup_applications(self):
+        """Configure applications JARVIS can launch with cross-platform support"""
+        self.applications = {
+            "calculator": {
+                "windows": "calc.exe",
+                "linux": "gnome-calculator" if self.check_command_exists("gnome-calculator") else "kcalc",
+                "mac": "Calculator"
+            },
+            "notepad": {
+                "windows": "notepad.exe",
+                "linux": "gedit" if self.check_command_exists("gedit") else "nano",
+                "mac": "TextEdit"
+            },
+            "browser": {
+                "windows": "start chrome",
+                "linux": "xdg-open https://www.google.com",
+                "mac": "open -a Safari"
+            },
+            "spotify": {
+                "windows": "spotify",
+                "linux": "spotify" if self.check_command_exists("spotify") else "xdg-open https://open.spotify.com",
+                "mac": "open -a Spotify"
+            },
+            "terminal": {
+                "windows": "cmd.exe",
+                "linux": "gnome-terminal" if self.check_command_exists("gnome-terminal") else "x-terminal-emulator",
+                "mac": "Terminal"
+            },
+            "file explorer": {
+                "windows": "explorer",
+                "linux": "nautilus" if self.check_command_exists("nautilus") else "xdg-open .",
+                "mac": "open ."
+            }
+        }
+
+    def check_command_exists(self, cmd):
+        """Check if a command exists on Linux systems"""
+        if self.system_os != 'linux':
+            return False
+        return shutil.which(cmd) is not None
+
+    def setup_responses(self):
+        """Set up default responses with formal language"""
+        hour = datetime.datetime.now().hour
+        time_of_day = "morning" if 5 <= hour < 12 else "afternoon" if 12 <= hour < 17 else "evening"
+        
+        self.responses = {
+            "greeting": [
+                f"Systems online. Good {time_of_day} {self.user_name}. How may I assist you today?",
+                f"All systems operational. Good {time_of_day} {self.user_name}. Ready for your commands.",
+                f"Initialization complete. Good {time_of_day} {self.user_name}. How can I be of service?"
+            ],
+            "farewell": [
+                "Shutting down systems. Goodbye Sir.",
+                "Powering off. Until next time Sir.",
+                "Terminating session. It's been a pleasure serving you."
+            ],
+            "gratitude": [
+                "You're most welcome Sir. Always at your service.",
+                "My pleasure, as always Sir.",
+                "Gratitude acknowledged. Happy to assist."
+            ],
+            "apology": [
+                "No need to apologize Sir. How may I assist you?",
+                "All is forgiven Sir. What can I do for you?",
+                "No offense taken Sir. How may I be of service?"
+            ],
+            "time": [
+                "The current time is {time}.",
+                "My internal clock shows {time}.",
+                "It is currently {time}."
+            ],
+            "date": [
+                "Today's date is {date}.",
+                "According to my calendar, it's {date}.",
+                "The date is {date}."
+            ],
+            "diagnostics": [
+                "Running comprehensive diagnostic scan...",
+                "Initiating system self-check protocols...",
+                "Commencing full diagnostic sequence..."
+            ],
+            "app_success": [
+                "Initializing requested application, {}.",
+                "Launching {} as requested.",
+                "Opening {} for you."
+            ],
+            "app_fail": [
+                "Failed to launch {}. It may not be installed.",
+                "Unable to access {}. Please check system permissions.",
+                "Application {} not responding."
+            ],
+            "wake_word": [
+                "Yes Sir? How may I assist you?",
+                "At your service Sir.",
+                "Listening Sir."
+            ],
+            "memory": [
+                "I've stored that information for you.",
+                "Consider it remembered.",
+                "Added to my memory banks."
+            ],
+            "translation": [
+                "The translation is: {}",
+                "In the requested language: {}",
+                "Translated: {}"
+            ],
+            "app_list": [
+                "Here are the applications I can launch: {}",
+                "Registered applications: {}",
+                "Available apps: {}"
+            ],
+            "search": [
+                "Searching for '{}'...",
+                "Looking up '{}'...",
+                "Querying '{}'..."
+            ]
+        }
+
+    def setup_intents(self):
+        """Register voice command handlers with the intent router"""
+        self.router = IntentRouter()
+        register = self.router.register
+        # Registration order is priority order when several phrases match
+        register("memory.name", ["my name is"], self._intent_set_name)
+        register("memory.remember", ["remember that"], self._intent_remember)
+        register("memory.recall", ["what is my"], self._intent_recall)
+        register("list.create", ["create a list called"], self._intent_create_list)
+        register("list.add", ["add"], self._intent_add_to_list, requires=("to", "list"))
+        register("list.show", ["show me the"], self._intent_show_list, requires=("list",))
+        register("dict.create", ["create a dictionary called"], self._intent_create_dict)
+        register("dict.add", ["add"], self._intent_add_to_dict, requires=("is", "to", "dictionary"))
+        register("dict.show", ["show me the"], self._intent_show_dict, requires=("dictionary",))
+        register("search.google", ["search google for", "google", "look up"], self._intent_google_search)
+        register("search.youtube", ["search youtube for", "youtube", "play"], self._intent_youtube_search)
+        register("translate", ["translate", "how do you say"], self._intent_translate)
+        register("apps.list", ["list apps", "what apps can you open", "available applications"],
+                 lambda command, match: self.list_registered_apps())
+        register("conversation.reset", ["new conversation", "forget our conversation", "clear conversation"],
+                 self._intent_reset_conversation)
+        register("gratitude", ["thank", "thanks"],
+                 lambda command, match: self.jarvis_speak(random.choice(self.responses["gratitude"])))
+        register("apology", ["sorry", "apologize"],
+                 lambda command, match: self.jarvis_speak(random.choice(self.responses["apology"])))
+        register("greeting", ["hello", "hi", "hey"],
+                 lambda command, match: self.jarvis_speak(random.choice(self.responses["greeting"])))
+        register("farewell", ["goodbye", "exit", "quit"], self._intent_farewell)
+        register("time", ["time"], self._intent_time)
+        register("date", ["date"], self._intent_date)
+        register("diagnostics", ["diagnostic", "diagnostics", "system check"],
+                 lambda command, match: self.run_diagnostics())
+        register("launch", ["open", "launch", "start"],
+                 lambda command, match: self.launch_application(match.tail))
+        logging.info(f"Intent router compiled with {len(self.router)} intents")
+
+    def process_voice_command(self, command, trace=None):
+        """Process voice commands with enhanced capabilities"""
+        trace = trace or self.tracer.start("text")
+        trace.command = command
+        self.tracer.activate(trace)
+        try:
+            with trace.span("routing"):
+                resolved = self.router.resolve(command)
+            if resolved:
+                handler, match = resolved
+                trace.intent = match.name
+                with trace.span("handler", intent=match.name):
+                    handler(command, match)
+                return
+
+            # Default to AI response
+            trace.intent = "ai"
+            with trace.span("handler", intent="ai"):
+                if self.streaming:
+                    self.jarvis_stream(self.stream_ai(command))
+                else:
+                    response = self.query_ai(command)
+                    self.jarvis_speak(response)
+        finally:
+            self.tracer.deactivate()
+            trace.release()
+
+    @staticmethod
+    def _drop_word(text, word):
+        """Remove a standalone word such as 'list' from a spoken name"""
+        return " ".join(token for token in text.split() if token != word)
+
+    def _intent_set_name(self, command, match):
+        name = match.tail
+        self.user_name = name  # Update current session name
+        if self.store_personal_info('name', name):
+            self.jarvis_speak(f"Understood, I'll call you {name} from now on.")
+        else:
+            self.jarvis_speak(f"I'll call you {name} for now, but I couldn't save it to memory.")
+
+    def _intent_remember(self, command, match):
+        # Extract key-value pair (e.g., "remember that my birthday is June 5th")
+        parts = match.tail.split(" is ")
+        if len(parts) == 2:
+            key = parts[0].strip()
+            value = parts[1].strip()
+            if self.store_personal_info(key, value):
+                self.jarvis_speak(random.choice(self.responses["memory"]))
+            else:
+                self.jarvis_speak(self.MEMORY_WRITE_FAILED)
+        else:
+            self.jarvis_speak("Please specify what to remember in the format: 'remember that [key] is [value]'")
+
+    def _intent_recall(self, command, match):
+        key = match.tail
+        value = self.recall_personal_info(key)
+        if value:
+            self.jarvis_speak(f"Your {key} is {value}")
+        else:
+            self.jarvis_speak(f"I don't have information about your {key}")
+
+    def _intent_create_list(self, command, match):
+        list_name = match.tail
+        if not self.create_custom_list(list_name):
+            self.jarvis_speak(self.MEMORY_WRITE_FAILED)
+            return
+        self.jarvis_speak(f"I've created a new list called {list_name}. You can add items by saying 'add [item] to {list_name}'")
+
+    def _intent_add_to_list(self, command, match):
+        try:
+            item, list_name = match.tail.rsplit(" to ", 1)
+            item = item.strip()
+            list_name = self._drop_word(list_name, "list")
+            if self.add_to_custom_list(list_name, item):
+                self.jarvis_speak(f"Added {item} to {list_name}")
+            elif list_name in self.user_memory['custom_lists']:
+                self.jarvis_speak(self.MEMORY_WRITE_FAILED)
+        except Exception as e:
+            self.jarvis_speak("I couldn't process that list addition. Please try again.")
+
+    def _intent_show_list(self, command, match):
+        self.show_custom_list(self._drop_word(match.tail, "list"))
+
+    def _intent_create_dict(self, command, match):
+        dict_name = match.tail
+        if not self.create_custom_dict(dict_name):
+            self.jarvis_speak(self.MEMORY_WRITE_FAILED)
+            return
+        self.jarvis_speak(f"I've created a new dictionary called {dict_name}. You can add entries by saying 'add [key] is [value] to {dict_name}'")
+
+    def _intent_add_to_dict(self, command, match):
+        try:
+            # Format: "add [key] is [value] to [dict_name] dictionary"
+            key_part, rest = match.tail.split(" is ", 1)
+            value_part, dict_name = rest.rsplit(" to ", 1)
+            key_part = key_part.strip()
+            value_part = value_part.strip()
+            dict_name = self._drop_word(dict_name, "dictionary")
+            if self.add_to_custom_dict(dict_name, key_part, value_part):
+                self.jarvis_speak(f"Added {key_part} as {value_part} to {dict_name} dictionary")
+            elif dict_name in self.user_memory['custom_dicts']:
+                self.jarvis_speak(self.MEMORY_WRITE_FAILED)
+        except Exception as e:
+            self.jarvis_speak("I couldn't process that dictionary addition. Please try again.")
+
+    def _intent_show_dict(self, command, match):
+        self.show_custom_dict(self._drop_word(match.tail, "dictionary"))
+
+    def _intent_google_search(self, command, match):
+        self.google_search(re.sub(r"^for\s+", "", match.tail))
+
+    def _intent_youtube_search(self, command, match):
+        self.youtube_search(re.sub(r"^for\s+", "", match.tail))
+
+    def _intent_translate(self, command, match):
+        parts = match.tail.rsplit(" to ", 1)
+        if len(parts) == 2:
+            text, lang = parts
+            self.translate_text(text.strip(), lang.strip())
+        else:
+            self.jarvis_speak("Please specify text and target language (e.g., 'translate hello to Spanish').")
+
+    def _intent_reset_conversation(self, command, match):
+        self.context.clear()
+        self.jarvis_speak("Conversation context cleared. Starting fresh.")
+
+    def _intent_farewell(self, command, match):
+        self.jarvis_speak(random.choice(self.responses["farewell"]))
+        self.request_exit(1000)
+
+    def _intent_time(self, command, match):
+        current_time = datetime.datetime.now().strftime("%H:%M:%S")
+        self.jarvis_speak(random.choice(self.responses["time"]).format(time=current_time))
+
+    def _intent_date(self, command, match):
+        current_date = datetime.datetime.now().strftime("%A, %B %d, %Y")
+        self.jarvis_speak(random.choice(self.responses["date"]).format(date=current_date))
+
+    def run_diagnostics(self):
+        """Perform and display system diagnostics"""
+        self.jarvis_speak(random.choice(self.responses["diagnostics"]))
+        
+        diagnostics = []
+        diagnostics.append("\n=== SYSTEM HEALTH ===")
+        sample = self.metrics.latest()
+        if sample:
+            diagnostics.append(f"CPU Usage: {sample.cpu}% (avg {self.metrics.average('cpu'):.1f}% "
+                               f"over {len(self.metrics.samples)} samples)")
+            diagnostics.append(f"Memory Usage: {sample.ram}%")
+            diagnostics.append(f"Network: {sample.net_sent_rate / 1024:.1f} KB/s up, "
+                               f"{sample.net_recv_rate / 1024:.1f} KB/s down")
+            diagnostics.append(f"JARVIS Process: {sample.process_cpu}% CPU, "
+                               f"{sample.process_rss / (1024 * 1024):.0f} MB RSS, {sample.process_threads} threads")
+        else:
+            diagnostics.append("Metrics: Sampling in progress")
+        
+        diagnostics.append("\n=== AI SYSTEMS ===")
+        diagnostics.append(f"{self.backend.name} Status: {self.ai_status} ({self.breaker.describe()})")
+        diagnostics.append(f"Model: {self.backend.model_name or 'none selected'}")
+        for line in self.backend.routing_summary():
+            diagnostics.append(f"  {line}")
+        
+        if self.stream_stats:
+            first_tokens = [s['first_token'] for s in self.stream_stats if s['first_token'] is not None]
+            first_audio = [s['first_audio'] for s in self.stream_stats if s['first_audio'] is not None]
+            diagnostics.append(f"Streamed Replies: {len(self.stream_stats)}")
+            if first_tokens:
+                diagnostics.append(f"Avg Time to First Token: {sum(first_tokens) / len(first_tokens) * 1000:.0f} ms")
+            if first_audio:
+                diagnostics.append(f"Avg Time to First Audio: {sum(first_audio) / len(first_audio) * 1000:.0f} ms")
+        
+        cache_stats = self.response_cache.stats()
+        diagnostics.append("\n=== RESPONSE CACHE ===")
+        diagnostics.append(f"Cached Responses: {cache_stats['entries']}/{cache_stats['max_entries']}")
+        diagnostics.append(f"Cache Hits: {cache_stats['hits']} | Misses: {cache_stats['misses']} | "
+                           f"Hit Rate: {cache_stats['hit_rate']:.0%}")
+        flight_stats = self.inflight.stats()
+        diagnostics.append(f"Backend Calls: {flight_stats['executed']} | "
+                           f"Coalesced Duplicates: {flight_stats['coalesced']} (calls saved)")
+        
+        context_stats = self.context.stats()
+        diagnostics.append("\n=== CONVERSATION CONTEXT ===")
+        diagnostics.append(f"Turns Held: {context_stats['turns']} | Summary: {context_stats['summary_tokens']} tokens "
+                           f"({context_stats['summary_calls']} backend summaries)")
+        diagnostics.append(f"Prompt Size: last {context_stats['last_prompt_tokens']} | "
+                           f"avg {context_stats['avg_prompt_tokens']:.0f} | max {context_stats['max_prompt_tokens']} "
+                           f"tokens (budget {self.context.token_budget})")
+        
+        diagnostics.append("\n=== APPLICATION PROTOCOLS ===")
+        diagnostics.append(f"Registered Apps: {len(self.applications)}")
+        
+        diagnostics.append("\n=== MEMORY SYSTEMS ===")
+        diagnostics.append(f"Personal Info Items: {len(self.user_memory['personal_info'])}")
+        diagnostics.append(f"Custom Lists: {len(self.user_memory['custom_lists'])}")
+        diagnostics.append(f"Custom Dictionaries: {len(self.user_memory['custom_dicts'])}")
+        
+        latency = self.tracer.summary()
+        if latency:
+            diagnostics.append("\n=== PIPELINE LATENCY (p50 / p95 / p99) ===")
+            diagnostics.extend(latency)
+        
+        diag_results = "\n".join(diagnostics)
+        self.update_chat("JARVIS", diag_results, 'system')
+
+        # Live checks run concurrently and report as each one finishes
+        self.update_chat("JARVIS", "=== LIVE PROBES ===", 'system')
+        results = self.run_probes(on_result=self._report_probe)
+        self.jarvis_speak("Diagnostics complete. All systems nominal." if all(ok for ok, _, _ in results.values())
+                        else "Diagnostics complete. Minor anomalies detected.")
+
+    def _report_probe(self, name, ok, detail, elapsed):
+        self.update_chat("SYSTEM", f"{name}: {'OK' if ok else 'FAIL'} - {detail} ({elapsed * 1000:.0f} ms)",
+                         'system' if ok else 'warning')
+
+    def setup_probes(self):
+        """Register the built-in diagnostic probes"""
+        self.register_probe("Network", self._probe_network, timeout=2)
+        self.register_probe("DNS", self._probe_dns, timeout=2)
+        self.register_probe("AI Backend", self._probe_ai, timeout=3)
+        self.register_probe("TTS", self._probe_tts, timeout=1)
+        self.register_probe("Memory Store", self._probe_memory_store, timeout=1)
+        self.register_probe("Disk", self._probe_disk, timeout=1)
+
+    def register_probe(self, name, check, timeout=2.0):
+        """Add or replace a probe; check(timeout) returns (ok, detail)"""
+        self.probes[name] = DiagnosticProbe(name, check, timeout)
+
+    def run_probes(self, on_result=None):
+        """Run every probe concurrently, each bounded by its own timeout
+
+        on_result(name, ok, detail, elapsed) is called as each probe finishes,
+        so total wall time is that of the slowest probe rather than the sum.
+        """
+        results = {}
+        if not self.probes:
+            return results
+        finished = queue.Queue()
+
+        def run(probe):
+            try:
+                ok, detail = probe.check(probe.timeout)
+            except Exception as e:
+                ok, detail = False, str(e) or type(e).__name__
+            finished.put((probe.name, ok, detail))
+
+        started = time.perf_counter()
+        # Daemon threads, not an executor: a probe stuck in a blocking call is
+        # abandoned at its timeout and never holds up interpreter exit
+        for probe in self.probes.values():
+            threading.Thread(target=run, args=(probe,), daemon=True, name=f"probe-{probe.name}").start()
+        pending = dict(self.probes)
+        while pending:
+            deadline = min(started + probe.timeout for probe in pending.values())
+            try:
+                name, ok, detail = finished.get(timeout=max(deadline - time.perf_counter(), 0))
+            except queue.Empty:
+                name = None
+            now = time.perf_counter()
+            reported = [(name, ok, detail)] if name in pending else []
+            reported += [(probe.name, False, f"Timed out after {probe.timeout}s") for probe in pending.values()
+                         if probe.name != name and now >= started + probe.timeout]
+            for name, ok, detail in reported:
+                del pending[name]
+                results[name] = (ok, detail, now - started)
+                if on_result:
+                    on_result(name, ok, detail, now - started)
+        return results
+
+    def _probe_network(self, timeout):
+        with socket.create_connection(("8.8.8.8", 53), timeout=timeout):
+            return True, "Internet connection active"
+
+    def _probe_dns(self, timeout):
+        # getaddrinfo has no timeout of its own, so resolve on a thread we can walk away from
+        result = {}
+
+        def resolve():
+            try:
+                result['addresses'] = socket.getaddrinfo("www.google.com", 443, proto=socket.IPPROTO_TCP)
+            except Exception as e:
+                result['error'] = e
+
+        resolver = threading.Thread(target=resolve, daemon=True)
+        resolver.start()
+        resolver.join(timeout)
+        if 'error' in result:
+            raise result['error']
+        if 'addresses' not in result:
+            return False, f"DNS lookup timed out after {timeout}s"
+        return True, f"Resolved www.google.com to {result['addresses'][0][4][0]}"
+
+    def _probe_ai(self, timeout):
+        if not self.ai_ready.is_set():
+            self.ai_ready.wait(timeout)
+        ok, detail = self.backend.health(timeout)
+        return ok and self.ai_enabled, f"{self.backend.name}: {detail}"
+
+    def _probe_tts(self, timeout):
+        if not self.speech:
+            return False, "No speech output attached"
+        return True, "Speech output attached"
+
+    def _probe_memory_store(self, timeout):
+        journal = self.memory_journal
+        directory = os.path.dirname(os.path.abspath(self.memory_file))
+        if not os.access(directory, os.W_OK):
+            return False, f"{directory} is not writable"
+        return True, f"Seq {journal.seq}, {journal.pending_ops} journaled ops, {journal.compactions} compactions"
+
+    def _probe_disk(self, timeout):
+        usage = shutil.disk_usage(os.path.dirname(os.path.abspath(self.memory_file)))
+        free = usage.free / usage.total
+        return free > 0.05, f"{usage.free / (1024 ** 3):.1f} GB free ({free:.0%})"
+
+    def launch_application(self, app_name):
+        """Launch system applications with cross-platform support"""
+        app_name = app_name.lower()
+        if app_name in self.applications:
+            try:
+                command = self.applications[app_name].get(self.system_os)
+                if command:
+                    if self.system_os == 'windows':
+                        subprocess.Popen(command, shell=True)
+                    else:
+                        # Handle Linux/Mac commands
+                        if command.startswith("xdg-open") or command.startswith("open"):
+                            subprocess.Popen(command.split())
+                        else:
+                            subprocess.Popen([command])
+                    self.jarvis_speak(random.choice(self.responses["app_success"]).format(app_name))
+                else:
+                    raise Exception(f"Unsupported OS for {app_name}")
+            except Exception as e:
+                logging.error(f"App launch error: {e}")
+                self.jarvis_speak(random.choice(self.responses["app_fail"]).format(app_name))
+        else:
+            self.jarvis_speak(f"Application {app_name} not in my protocol database")
+
+    def query_ai(self, prompt):
+        """Get a response from the AI backend in JARVIS style"""
+        # Cached answers never touch the network, whatever the breaker says
+        self._await_model_name()
+        contextual = self.context.is_follow_up(prompt)
+        key = self._cache_key(prompt, contextual)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            self.context.add_exchange(prompt, cached)
+            return cached
+
+        if not self.await_ai():
+            return "AI systems offline. Running in limited capacity."
+
+        trace = self.tracer.current()
+        started = time.perf_counter()
+        try:
+            response = self.inflight.do(key, lambda: self._generate(key, self._jarvis_prompt(prompt, contextual)))
+            self.context.add_exchange(prompt, response)
+            if trace:
+                trace.add_span("llm", started, time.perf_counter(), streamed=False,
+                               prompt_tokens=self.context.last_prompt_tokens)
+            return response
+        except Exception as e:
+            logging.error(f"AI Generation Error: {e}")
+            return "I'm experiencing technical difficulties. Please try again later."
+
+    def stream_ai(self, prompt):
+        """Yield an AI response in chunks as it is generated"""
+        self._await_model_name()
+        contextual = self.context.is_follow_up(prompt)
+        key = self._cache_key(prompt, contextual)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            self.context.add_exchange(prompt, cached)
+            yield cached
+            return
+
+        if not self.await_ai():
+            yield "AI systems offline. Running in limited capacity."
+            return
+
+        trace = self.tracer.current()
+        started = time.perf_counter()
+        first_token = None
+        parts = []
+        try:
+            for chunk in self.inflight.stream(key, lambda: self._generate_stream(key, self._jarvis_prompt(prompt, contextual))):
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+                parts.append(chunk)
+                yield chunk
+            self.context.add_exchange(prompt, "".join(parts))
+            if trace:
+                trace.add_span("llm", started, time.perf_counter(), streamed=True,
+                               first_token_ms=round((first_token or 0) * 1000, 3),
+                               prompt_tokens=self.context.last_prompt_tokens)
+        except Exception as e:
+            if parts:
+                # Keep what already reached the user; a partial answer is not cached
+                logging.warning(f"AI stream interrupted after {len(parts)} chunks: {e}")
+                self.context.add_exchange(prompt, "".join(parts))
+                return
+            logging.error(f"AI Streaming Error: {e}")
+            yield "I'm experiencing technical difficulties. Please try again later."
+
+    def _generate(self, key, prompt):
+        """Make one backend call, recording its outcome and caching the reply"""
+        try:
+            response = self.backend.generate(prompt)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        self.response_cache.put(key, response)
+        return response
+
+    def _generate_stream(self, key, prompt):
+        """Stream one backend call; progress counts as success, silence as failure"""
+        parts = []
+        try:
+            for chunk in self.backend.stream(prompt):
+                if not parts:
+                    self.breaker.record_success()
+                parts.append(chunk)
+                yield chunk
+        except Exception:
+            if not parts:
+                self.breaker.record_failure()
+            raise
+        if not parts:
+            self.breaker.record_success()
+        self.response_cache.put(key, "".join(parts))
+
+    def _cache_key(self, prompt, contextual=True):
+        # Follow-up questions are answered from the conversation, so the context is part of their key
+        return ResponseCache.make_key(prompt, self.user_name, f"{self.backend.name}:{self.backend.model_name}",
+                                      self.context.fingerprint() if contextual else "")
+
+    def _persona(self):
+        return (
+            f"Respond as JARVIS from Iron Man to {self.user_name}. "
+            f"Be concise (1-2 sentences), technical, and slightly witty."
+        )
+
+    def _jarvis_prompt(self, prompt, contextual=True):
+        persona = self._persona()
+        self.backend.prime(persona)
+        return self.context.build_prompt(persona, prompt, history=contextual)
+
+    def _summarize_context(self, summary):
+        """Condense older conversation turns with the AI backend while it is healthy"""
+        if not self.ai_enabled or self.breaker.state != CircuitBreaker.CLOSED or not self.breaker.allow():
+            return None
+        prompt = (f"Summarize this conversation between {self.user_name} and JARVIS in at most three short "
+                  f"sentences, keeping names, facts and open questions:\n{summary}")
+        key = self._cache_key(prompt, contextual=False)
+        return self.inflight.do(key, lambda: self._generate(key, prompt)).strip()
+
+    # Memory System Methods
+    def record_memory(self, op):
+        """Append a memory mutation to the journal and apply it; False if it could not be saved"""
+        try:
+            self.memory_journal.append(op)
+        except Exception as e:
+            logging.error(f"Error saving memory: {e}")
+            return False
+        MemoryJournal.apply(self.user_memory, op)
+        return True
+
+    def store_personal_info(self, key, value):
+        """Store personal information about the user"""
+        return self.record_memory({'op': 'set_info', 'key': key.lower(), 'value': value})
+
+    def recall_personal_info(self, key):
+        """Retrieve stored personal information"""
+        return self.user_memory['personal_info'].get(key.lower())
+
+    def create_custom_list(self, list_name):
+        """Create a new custom list"""
+        if list_name not in self.user_memory['custom_lists']:
+            return self.record_memory({'op': 'create_list', 'name': list_name})
+        return True
+
+    def add_to_custom_list(self, list_name, item):
+        """Add an item to a custom list"""
+        if list_name in self.user_memory['custom_lists']:
+            return self.record_memory({'op': 'append_list', 'name': list_name, 'item': item})
+        self.jarvis_speak(f"I couldn't find a list named {list_name}")
+        return False
+
+    def show_custom_list(self, list_name):
+        """Display the contents of a custom list"""
+        if list_name in self.user_memory['custom_lists']:
+            items = self.user_memory['custom_lists'][list_name]
+            if items:
+                list_str = "\n".join(f"- {item}" for item in items)
+                self.update_chat("JARVIS", f"Contents of {list_name} list:\n{list_str}", 'system')
+                self.jarvis_speak(f"Here's your {list_name} list with {len(items)} items")
+            else:
+                self.jarvis_speak(f"The {list_name} list is currently empty")
+        else:
+            self.jarvis_speak(f"I couldn't find a list named {list_name}")
+
+    def create_custom_dict(self, dict_name):
+        """Create a new custom dictionary"""
+        if dict_name not in self.user_memory['custom_dicts']:
+            return self.record_memory({'op': 'create_dict', 'name': dict_name})
+        return True
+
+    def add_to_custom_dict(self, dict_name, key, value):
+        """Add a key-value pair to a custom dictionary"""
+        if dict_name in self.user_memory['custom_dicts']:
+            return self.record_memory({'op': 'set_dict', 'name': dict_name, 'key': key, 'value': value})
+        self.jarvis_speak(f"I couldn't find a dictionary named {dict_name}")
+        return False
+
+    def show_custom_dict(self, dict_name):
+        """Display the contents of a custom dictionary"""
+        if dict_name in self.user_memory['custom_dicts']:
+            items = self.user_memory['custom_dicts'][dict_name]
+            if items:
+                dict_str = "\n".join(f"- {k}: {v}" for k, v in items.items())
+                self.update_chat("JARVIS", f"Contents of {dict_name} dictionary:\n{dict_str}", 'system')
+                self.jarvis_speak(f"Here's your {dict_name} dictionary with {len(items)} entries")
+            else:
+                self.jarvis_speak(f"The {dict_name} dictionary is currently empty")
+        else:
+            self.jarvis_speak(f"I couldn't find a dictionary named {dict_name}")
+
+    def save_memory(self):
+        """Compact the memory journal into a full snapshot"""
+        try:
+            self.memory_journal.compact()
+        except Exception as e:
+            logging.error(f"Error saving memory: {e}")
+
+    def load_memory(self):
+        """Load the memory snapshot and replay the journal on top of it"""
+        try:
+            self.user_memory = self.memory_journal.load(self.user_memory)
+            # Update user name if stored
+            if 'name' in self.user_memory['personal_info']:
+                self.user_name = self.user_memory['personal_info']['name']
+        except Exception as e:
+            logging.error(f"Error loading memory: {e}")
+
+    # --- New Methods for Advanced Features ---
+    def google_search(self, query):
+        """Open a browser with Google search results"""
+        search_url = f"https://www.google.com/search?q={urllib.parse.quote(query)}"
+        self.jarvis_speak(random.choice(self.responses["search"]).format(query))
+        if self.system_os == 'windows':
+            webbrowser.open(search_url)
+        else:
+            subprocess.Popen(['xdg-open', search_url])
+
+    def youtube_search(self, query):
+        """Open a browser with YouTube search results"""
+        search_url = f"https://www.youtube.com/results?search_query={urllib.parse.quote(query)}"
+        self.jarvis_speak(f"Searching YouTube for {query}...")
+        if self.system_os == 'windows':
+            webbrowser.open(search_url)
+        else:
+            subprocess.Popen(['xdg-open', search_url])
+
+    def translate_text(self, text, target_lang):
+        """Translate text using the AI backend (fallback to basic if offline)"""
+        self._await_model_name()
+        prompt = f"Translate '{text}' to {target_lang}. Return only the translation."
+        key = self._cache_key(prompt, contextual=False)
+        translation = self.response_cache.get(key)
+        if translation is not None or self.await_ai():
+            try:
+                if translation is None:
+                    translation = self.inflight.do(key, lambda: self._generate(key, prompt))
+                translation = translation.strip()
+                self.jarvis_speak(random.choice(self.responses["translation"]).format(translation))
+            except Exception as e:
+                logging.error(f"Translation error: {e}")
+                self.jarvis_speak("AI translation failed. Using basic fallback...")
+                self.basic_translation(text, target_lang)
+        else:
+            self.basic_translation(text, target_lang)
+
+    def basic_translation(self, text, target_lang):
+        """Fallback translation for common phrases (expand as needed)"""
+        translations = {
+            "hello": {
+                "spanish": "hola",
+                "french": "bonjour",
+                "german": "hallo"
+            },
+            "goodbye": {
+                "spanish": "adiós",
+                "french": "au revoir",
+                "german": "auf wiedersehen"
+            }
+        }
+        
+        text_lower = text.lower()
+        lang_lower = target_lang.lower()
+        
+        if text_lower in translations and lang_lower in translations[text_lower]:
+            self.jarvis_speak(random.choice(self.responses["translation"]).format(
+                translations[text_lower][lang_lower]
+            ))
+        else:
+            self.jarvis_speak(f"I don't have a translation for '{text}' to {target_lang} in my database.")
+
+    def list_registered_apps(self):
+        """List all registered applications JARVIS can launch"""
+        apps = ", ".join(self.applications.keys())
+        self.jarvis_speak(random.choice(self.responses["app_list"]).format(apps))
+        self.update_chat("JARVIS", f"Registered Applications:\n- " + "\n- ".join(self.applications.keys()), 'system')
+
+
+Utterance = namedtuple('Utterance', ['text', 'on_done', 'on_start'])
+
+
+class VoiceOutput:
+    """Text-to-speech front-end that speaks queued utterances on its own thread"""
+
+    def __init__(self, system_os=None, max_pending=20, on_busy_change=None):
+        self.system_os = system_os or platform.system().lower()
+        self.on_busy_change = on_busy_change or (lambda busy: None)
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.busy = False
+        self.engine = None
+        self._ready = threading.Event()
+        self._interrupt = threading.Event()
+        self._worker = threading.Thread(target=self._speech_worker, daemon=True)
+        self._worker.start()
+        # pyttsx3 engines must be driven from the thread that created them
+        self._ready.wait(timeout=5)
+
+    def setup_voice(self):
+        """Configure text-to-speech with British accent"""
+        try:
+            self.engine = pyttsx3.init()
+            voices = self.engine.getProperty('voices')
+            
+            # Try to find a British male voice
+            preferred_voices = {
+                'windows': 'HKEY_LOCAL_MACHINE\\SOFTWARE\\Microsoft\\Speech\\Voices\\Tokens\\TTS_MS_EN-GB_DAVID_11.0',
+                'linux': 'english_rp',
+                'mac': 'com.apple.speech.synthesis.voice.daniel'
+            }
+            
+            # Set voice based on OS
+            if self.system_os in preferred_voices:
+                try:
+                    self.engine.setProperty('voice', preferred_voices[self.system_os])
+                except:
+                    # Fallback to any English male voice
+                    for voice in voices:
+                        if "english" in voice.languages and "male" in voice.name.lower():
+                            self.engine.setProperty('voice', voice.id)
+                            break
+            
+            self.engine.setProperty('rate', 170)
+            self.engine.setProperty('volume', 0.95)
+            self.engine.connect('started-word', self._on_word)
+            logging.info("Voice engine initialized successfully")
+        except Exception as e:
+            logging.error(f"Voice setup error: {e}")
+            self.engine = None
+
+    def _speech_worker(self):
+        """Own the TTS engine and speak utterances until shut down"""
+        self.setup_voice()
+        self._ready.set()
+        if not self.engine:
+            return
+
+        while True:
+            utterance = self.pending.get()
+            if utterance is None:
+                break
+
+            if not self.busy:
+                self.busy = True
+                self.on_busy_change(True)
+
+            self._interrupt.clear()
+            completed = True
+            try:
+                if utterance.on_start:
+                    utterance.on_start()
+                self.engine.say(utterance.text)
+                self.engine.runAndWait()
+                completed = not self._interrupt.is_set()
+            except Exception as e:
+                logging.error(f"Speech synthesis error: {e}")
+                completed = False
+            self._finish(utterance, completed)
+
+            if self.pending.empty():
+                self.busy = False
+                self.on_busy_change(False)
+
+    def _on_word(self, name, location, length):
+        # Runs inside runAndWait on the speech thread, the only thread allowed to stop the engine
+        if self._interrupt.is_set():
+            try:
+                self.engine.stop()
+            except Exception as e:
+                logging.error(f"Speech cancel error: {e}")
+
+    def _finish(self, utterance, completed):
+        if utterance.on_done:
+            try:
+                utterance.on_done(completed)
+            except Exception as e:
+                logging.error(f"Speech callback error: {e}")
+
+    def speak(self, text, on_start=None, on_done=None):
+        """Queue text for speech without blocking; callbacks run on the speech thread"""
+        utterance = Utterance(text, on_done, on_start)
+        while True:
+            try:
+                self.pending.put_nowait(utterance)
+                return utterance
+            except queue.Full:
+                # Drop the oldest pending utterance rather than stall the caller
+                try:
+                    dropped = self.pending.get_nowait()
+                except queue.Empty:
+                    continue
+                logging.warning(f"Speech queue full, dropping: {dropped.text[:40]}")
+                self._finish(dropped, False)
+
+    def flush(self):
+        """Discard utterances that have not started yet"""
+        while True:
+            try:
+                utterance = self.pending.get_nowait()
+            except queue.Empty:
+                return
+            if utterance is None:
+                # Keep a pending shutdown request
+                self.pending.put_nowait(None)
+                return
+            self._finish(utterance, False)
+
+    def cancel(self):
+        """Discard pending utterances and interrupt the one being spoken"""
+        self.flush()
+        if self.engine and self.busy:
+            # The speech thread stops the engine at the next word boundary
+            self._interrupt.set()
+
+    def shutdown(self):
+        """Stop the speech thread after cancelling outstanding speech"""
+        self.cancel()
+        try:
+            self.pending.put_nowait(None)
+        except queue.Full:
+            pass
+
+
+SpeechSegment = namedtuple('SpeechSegment', ['pcm', 'sample_rate', 'sample_width',
+                                             'speech_start', 'speech_end', 'emitted'])
+
+
+class VoiceActivityDetector:
+    """Energy and zero-crossing VAD that cuts a raw PCM stream into utterances
+
+    Each block is split into 20 ms frames whose energy and zero-crossing rate
+    are computed in one NumPy pass. A frame is speech when its energy clears
+    the adaptive noise floor by energy_ratio, or by fricative_ratio with the
+    high zero-crossing rate of an unvoiced consonant. An utterance ends after
+    a run of silence that adapts to the speaker: base_silence, stretched to
+    1.5x the typical pause already seen inside the utterance, capped at
+    max_silence.
+    """
+
+    def __init__(self, sample_rate=16000, sample_width=2, frame_ms=20, energy_ratio=3.0,
+                 fricative_ratio=1.5, fricative_zcr=0.25, min_energy=1e-6, start_frames=3,
+                 base_silence=0.3, max_silence=0.9, pre_roll=0.3, max_utterance=30.0,
+                 min_speech=0.15, clock=time.perf_counter):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.frame = int(sample_rate * frame_ms / 1000)
+        self.frame_seconds = self.frame / sample_rate
+        self.energy_ratio = energy_ratio
+        self.fricative_ratio = fricative_ratio
+        self.fricative_zcr = fricative_zcr
+        self.min_energy = min_energy
+        self.start_frames = start_frames
+        self.base_silence = base_silence
+        self.max_silence = max_silence
+        self.max_utterance = max_utterance
+        self.min_speech = min_speech
+        self.clock = clock
+        self.noise = None
+        self.end_delays = deque(maxlen=100)
+        self._pre_roll = deque(maxlen=max(1, int(pre_roll / self.frame_seconds)))
+        self._pending = b""
+        self.reset()
+
+    def reset(self):
+        """Drop any partial utterance, keeping the learned noise floor"""
+        self.in_speech = False
+        self._frames = []
+        self._pre_roll.clear()
+        self._pending = b""
+        self._speech_run = 0
+        self._silence_run = 0
+        self._speech_frames = 0
+        self._pauses = []
+        self._speech_start = self._last_speech = None
+
+    def _features(self, pcm):
+        dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[self.sample_width]
+        samples = np.frombuffer(pcm, dtype=dtype).astype(np.float32)
+        if self.sample_width == 1:
+            samples -= 128
+        frames = samples.reshape(-1, self.frame) / float(2 ** (8 * self.sample_width - 1))
+        energy = np.mean(frames ** 2, axis=1)
+        zcr = np.mean(np.signbit(frames[:, 1:]) != np.signbit(frames[:, :-1]), axis=1)
+        return energy, zcr
+
+    def calibrate(self, pcm):
+        """Seed the noise floor from audio known to contain no speech"""
+        usable = len(pcm) - len(pcm) % (self.frame * self.sample_width)
+        if usable:
+            energy, _ = self._features(pcm[:usable])
+            self.noise = max(float(np.median(energy)), self.min_energy)
+
+    def end_silence(self):
+        """Seconds of silence that end the current utterance"""
+        if not self._pauses:
+            return self.base_silence
+        typical = float(np.median(self._pauses)) * self.frame_seconds
+        return min(self.max_silence, max(self.base_silence, 1.5 * typical))
+
+    def feed(self, pcm):
+        """Consume raw PCM and return any utterances that finished in it"""
+        data = self._pending + pcm
+        frame_bytes = self.frame * self.sample_width
+        usable = len(data) - len(data) % frame_bytes
+        self._pending = data[usable:]
+        if not usable:
+            return []
+
+        energy, zcr = self._features(data[:usable])
+        if self.noise is None:
+            self.noise = max(float(np.percentile(energy, 20)), self.min_energy)
+        floor = max(self.noise, self.min_energy)
+        speech = (energy > floor * self.energy_ratio) | (
+            (energy > floor * self.fricative_ratio) & (zcr > self.fricative_zcr))
+        if not self.in_speech and not speech.any():
+            # Track slow changes in background noise while nobody is talking
+            self.noise = 0.9 * self.noise + 0.1 * max(float(np.mean(energy)), self.min_energy)
+
+        now = self.clock()
+        count = len(energy)
+        segments = []
+        for i in range(count):
+            frame = data[i * frame_bytes:(i + 1) * frame_bytes]
+            frame_end = now - (count - 1 - i) * self.frame_seconds
+            if not self.in_speech:
+                self._pre_roll.append(frame)
+                self._speech_run = self._speech_run + 1 if speech[i] else 0
+                if self._speech_run >= self.start_frames:
+                    self.in_speech = True
+                    self._frames = list(self._pre_roll)
+                    self._speech_start = frame_end - self.start_frames * self.frame_seconds
+                    self._last_speech = frame_end
+                    self._speech_frames = self.start_frames
+                continue
+
+            self._frames.append(frame)
+            if speech[i]:
+                if self._silence_run:
+                    self._pauses.append(self._silence_run)
+                self._silence_run = 0
+                self._speech_frames += 1
+                self._last_speech = frame_end
+            else:
+                self._silence_run += 1
+
+            too_long = len(self._frames) * self.frame_seconds >= self.max_utterance
+            if self._silence_run * self.frame_seconds >= self.end_silence() or too_long:
+                segment = self._finish(frame_end)
+                if segment:
+                    segments.append(segment)
+        return segments
+
+    def flush(self):
+        """End of stream: return the utterance in progress, if any"""
+        return self._finish(self.clock()) if self.in_speech else None
+
+    def _finish(self, emitted):
+        # Keep about 100 ms of trailing silence so recognizers see a clean ending
+        trailing = max(0, self._silence_run - int(0.1 / self.frame_seconds))
+        pcm = b"".join(self._frames[:len(self._frames) - trailing])
+        segment = None
+        if self._speech_frames * self.frame_seconds >= self.min_speech:
+            segment = SpeechSegment(pcm, self.sample_rate, self.sample_width,
+                                    self._speech_start, self._last_speech, emitted)
+            self.end_delays.append(emitted - self._last_speech)
+        noise = self.noise
+        self.reset()
+        self.noise = noise
+        return segment
+
+    def summary(self):
+        if not self.end_delays:
+            return "no utterances yet"
+        ordered = sorted(self.end_delays)
+        return (f"end-of-speech p50 {ordered[len(ordered) // 2] * 1000:.0f} ms over {len(ordered)} utterances, "
+                f"noise floor {10 * np.log10(max(self.noise or 0, 1e-12)):.0f} dBFS")
+
+
+class STTBackend:
+    """Interface for the speech-to-text engines behind the voice listener
+
+    recognize() follows speech_recognition's conventions: it raises
+    sr.UnknownValueError when nothing intelligible was said and
+    sr.RequestError (or any other exception) when the engine itself failed.
+    """
+
+    name = "None"
+    # False when results depend on call order, so calls must not overlap
+    concurrent = True
+
+    def __init__(self):
+        self.latencies = deque(maxlen=100)
+        self.calls = 0
+        self.errors = 0
+
+    def available(self):
+        return True
+
+    def recognize(self, audio):
+        raise NotImplementedError
+
+    def transcribe(self, audio):
+        """Recognize audio, recording latency for diagnostics"""
+        started = time.perf_counter()
+        self.calls += 1
+        try:
+            text = self.recognize(audio)
+        except sr.UnknownValueError:
+            self.latencies.append(time.perf_counter() - started)
+            raise
+        except Exception:
+            self.errors += 1
+            raise
+        self.latencies.append(time.perf_counter() - started)
+        return text.lower().strip()
+
+    def summary(self):
+        if not self.latencies:
+            return f"{self.name}: {self.calls} calls, {self.errors} errors"
+        ordered = sorted(self.latencies)
+        p50 = ordered[len(ordered) // 2]
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return (f"{self.name}: p50 {p50 * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms "
+                f"over {self.calls} calls, {self.errors} errors")
+
+
+class GoogleSTT(STTBackend):
+    """Google Web Speech API through speech_recognition (needs network)"""
+
+    name = "Google"
+
+    def __init__(self, operation_timeout=5):
+        super().__init__()
+        self.recognizer = sr.Recognizer()
+        # Fail fast when the network hangs so the local fallback can take over
+        self.recognizer.operation_timeout = operation_timeout
+
+    def recognize(self, audio):
+        return self.recognizer.recognize_google(audio)
+
+
+class LocalSTT(STTBackend):
+    """Offline CPU recognition with Whisper or PocketSphinx, whichever is installed"""
+
+    ENGINES = {'whisper': 'whisper', 'sphinx': 'pocketsphinx'}
+
+    def __init__(self, engine=None, model=None):
+        super().__init__()
+        self.recognizer = sr.Recognizer()
+        engine = engine or os.getenv('JARVIS_LOCAL_STT')
+        candidates = [engine] if engine else list(self.ENGINES)
+        self.engine = next((e for e in candidates if e in self.ENGINES
+                            and importlib.util.find_spec(self.ENGINES[e])), None)
+        self.model = model or os.getenv('JARVIS_WHISPER_MODEL', 'tiny.en')
+        self.name = f"Local ({self.engine or 'unavailable'})"
+        # One CPU-bound decode at a time; parallel decodes only compete for cores
+        self._lock = threading.Lock()
+
+    def available(self):
+        return self.engine is not None
+
+    def recognize(self, audio):
+        with self._lock:
+            if self.engine == 'whisper':
+                text = self.recognizer.recognize_whisper(audio, model=self.model, language="english")
+                if not text.strip():
+                    raise sr.UnknownValueError()
+                return text
+            return self.recognizer.recognize_sphinx(audio)
+
+
+class ReplaySTT(STTBackend):
+    """Returns recorded transcripts instead of recognizing audio
+
+    path is either a text file with one transcript per line, returned in
+    order, or a WAV file or directory of them with matching .txt transcripts.
+    Audio is matched to the recording it was cut from by a slice of its PCM,
+    so VAD segments of a replayed WAV still find their transcript; audio from
+    anywhere else is treated as unintelligible.
+    """
+
+    name = "Replay"
+
+    def __init__(self, path):
+        super().__init__()
+        self.recordings = []
+        self.ordered = deque()
+        if os.path.isdir(path) or path.lower().endswith('.wav'):
+            wav_paths = sorted(glob.glob(os.path.join(path, '*.wav'))) if os.path.isdir(path) else [path]
+            for wav_path in wav_paths:
+                txt_path = os.path.splitext(wav_path)[0] + '.txt'
+                if not os.path.exists(txt_path):
+                    continue
+                with open(txt_path) as f:
+                    transcript = f.read().strip()
+                self.recordings.append((WakeWordDetector.load_pcm(wav_path), transcript))
+        else:
+            with open(path) as f:
+                self.ordered.extend(line.strip() for line in f)
+        # Transcripts handed out in file order only line up if phrases arrive one at a time
+        self.concurrent = bool(self.recordings)
+        self._lock = threading.Lock()
+
+    def _lookup(self, audio):
+        pcm = audio.get_raw_data(convert_rate=WakeWordDetector.SAMPLE_RATE, convert_width=2)
+        middle = len(pcm) // 4 * 2
+        probe = pcm[middle:middle + 3200]
+        if probe:
+            for recording, transcript in self.recordings:
+                if probe in recording:
+                    return transcript
+        return None
+
+    def recognize(self, audio):
+        transcript = self._lookup(audio)
+        if transcript is None:
+            with self._lock:
+                if not self.ordered:
+                    raise sr.UnknownValueError()
+                transcript = self.ordered.popleft()
+        if not transcript:
+            raise sr.UnknownValueError()
+        return transcript
+
+
+class SpeechToText:
+    """Transcribes with the configured STT backend, falling back down the list
+
+    A backend that fails (network down, quota, engine error) has its circuit
+    opened, so following phrases go straight to the next backend until a
+    half-open retry succeeds. Unintelligible audio is not a failure and is
+    not retried elsewhere.
+    """
+
+    def __init__(self, backends):
+        self.backends = []
+        for backend in backends:
+            if backend.available():
+                self.backends.append(backend)
+            else:
+                logging.warning(f"Speech backend {backend.name} is not installed; skipping")
+        self.breakers = {backend.name: CircuitBreaker(f"{backend.name} STT", failure_threshold=1, reset_timeout=30)
+                         for backend in self.backends}
+        self.concurrent = all(backend.concurrent for backend in self.backends)
+
+    def transcribe(self, audio):
+        """Return (text, backend) or raise sr.UnknownValueError / sr.RequestError"""
+        errors = []
+        for backend in self.backends:
+            breaker = self.breakers[backend.name]
+            if not breaker.allow():
+                continue
+            try:
+                text = backend.transcribe(audio)
+            except sr.UnknownValueError:
+                breaker.record_success()
+                raise
+            except Exception as e:
+                breaker.record_failure()
+                errors.append(f"{backend.name}: {e}")
+                logging.warning(f"{backend.name} speech recognition failed ({e}); trying next backend")
+                continue
+            breaker.record_success()
+            return text, backend
+        raise sr.RequestError("; ".join(errors) or "No speech recognition backend available")
+
+    def summary(self):
+        return [backend.summary() for backend in self.backends]
+
+
+def create_speech_to_text(name=None, replay_path=None):
+    """Build the STT chain from config: google (with local fallback), local or replay"""
+    name = (name or os.getenv('JARVIS_STT_BACKEND', 'google')).lower()
+    if name == 'google':
+        return SpeechToText([GoogleSTT(), LocalSTT()])
+    if name == 'local':
+        return SpeechToText([LocalSTT()])
+    if name == 'replay':
+        return SpeechToText([ReplaySTT(replay_path or os.getenv('JARVIS_STT_REPLAY', 'stt_replay.txt'))])
+    raise ValueError(f"Unknown speech backend '{name}'. Choose from: google, local, replay")
+
+
+WakeResult = namedtuple('WakeResult', ['detected', 'distance', 'end_time', 'duration', 'wake_only'])
+Recognition = namedtuple('Recognition', ['segment', 'wake', 'wake_span', 'text', 'backend', 'stt_span'])
+
+
+class WakeWordDetector:
+    """Offline wake-word spotter matching audio against enrolled recordings
+
+    Templates and incoming phrases become MFCC frames; subsequence dynamic
+    time warping finds the best-aligned stretch near the start of the phrase
+    for every template. A phrase is a hit when the best length-normalized
+    cosine distance is at or below threshold. NumPy only, no model download.
+    """
+
+    SAMPLE_RATE = 16000
+    FRAME = 400  # 25 ms
+    HOP = 160  # 10 ms
+    N_FFT = 512
+    N_MELS = 26
+    N_MFCC = 13
+    WAKE_PREFIX = re.compile(r"^(?:(?:hey|ok|okay)\s+)?jarvis\b[\s,.!?]*")
+
+    def __init__(self, templates=(), threshold=0.3, search_seconds=2.0):
+        self.threshold = threshold
+        self.search_seconds = search_seconds
+        self._mel = self._mel_filterbank()
+        n = np.arange(self.N_MELS)
+        self._dct = np.cos(np.pi / self.N_MELS * (n + 0.5)[None, :] * np.arange(1, self.N_MFCC + 1)[:, None])
+        self._window = np.hamming(self.FRAME)
+        self.templates = [self.features(samples) for samples in templates]
+        self.templates = [t for t in self.templates if len(t) >= 3]
+
+    @classmethod
+    def from_directory(cls, path, threshold=None):
+        """Load every WAV in path as a template, or return None if there are none"""
+        files = sorted(glob.glob(os.path.join(path, '*.wav')))
+        if not files:
+            return None
+        if threshold is None:
+            threshold = float(os.getenv('JARVIS_WAKE_THRESHOLD', '0.3'))
+        detector = cls([cls.load_wav(f) for f in files], threshold=threshold)
+        logging.info(f"Wake word gate armed with {len(detector.templates)} templates from {path}")
+        return detector
+
+    @classmethod
+    def load_wav(cls, path):
+        """Read a PCM WAV file as mono float samples at SAMPLE_RATE"""
+        with wave.open(path, 'rb') as wav:
+            width = wav.getsampwidth()
+            rate = wav.getframerate()
+            channels = wav.getnchannels()
+            raw = wav.readframes(wav.getnframes())
+        dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[width]
+        samples = np.frombuffer(raw, dtype=dtype).astype(np.float32)
+        if width == 1:
+            samples -= 128
+        samples /= float(2 ** (8 * width - 1))
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1)
+        return cls.resample(samples, rate)
+
+    @classmethod
+    def load_pcm(cls, path):
+        """Read a WAV file as 16-bit mono PCM bytes at SAMPLE_RATE"""
+        samples = cls.load_wav(path)
+        return np.clip(np.round(samples * 32768), -32768, 32767).astype(np.int16).tobytes()
+
+    @classmethod
+    def resample(cls, samples, rate):
+        if rate == cls.SAMPLE_RATE or len(samples) == 0:
+            return samples
+        positions = np.arange(0, len(samples), rate / cls.SAMPLE_RATE)
+        return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+    @classmethod
+    def audio_samples(cls, audio):
+        """Convert a speech_recognition AudioData to float samples at SAMPLE_RATE"""
+        raw = audio.get_raw_data(convert_rate=cls.SAMPLE_RATE, convert_width=2)
+        return np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+
+    def _mel_filterbank(self):
+        def to_mel(hz):
+            return 2595 * np.log10(1 + hz / 700)
+
+        def to_hz(mel):
+            return 700 * (10 ** (mel / 2595) - 1)
+
+        edges = to_hz(np.linspace(to_mel(60), to_mel(self.SAMPLE_RATE / 2 - 200), self.N_MELS + 2))
+        bins = np.floor((self.N_FFT + 1) * edges / self.SAMPLE_RATE).astype(int)
+        bank = np.zeros((self.N_MELS, self.N_FFT // 2 + 1))
+        for m in range(1, self.N_MELS + 1):
+            left, center, right = bins[m - 1], bins[m], bins[m + 1]
+            if center > left:
+                bank[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+            if right > center:
+                bank[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+        return bank
+
+    def features(self, samples):
+        """Unit-length, mean-normalized MFCC frames (one row per 10 ms)"""
+        samples = np.asarray(samples, dtype=np.float32)
+        if len(samples) < self.FRAME:
+            return np.zeros((0, self.N_MFCC))
+        emphasized = np.append(samples[0], samples[1:] - 0.97 * samples[:-1])
+        count = 1 + (len(emphasized) - self.FRAME) // self.HOP
+        frames = np.lib.stride_tricks.as_strided(
+            emphasized, shape=(count, self.FRAME),
+            strides=(emphasized.strides[0] * self.HOP, emphasized.strides[0]))
+        power = np.abs(np.fft.rfft(frames * self._window, self.N_FFT)) ** 2
+        mfcc = np.log(power @ self._mel.T + 1e-10) @ self._dct.T
+        mfcc -= mfcc.mean(axis=0)
+        return mfcc / (np.linalg.norm(mfcc, axis=1, keepdims=True) + 1e-10)
+
+    @staticmethod
+    def _subsequence_dtw(template, query):
+        """Best normalized alignment of template anywhere in query -> (distance, end frame)
+
+        Step pattern (1,1), (2,1), (1,2) keeps alignments within 0.5x-2x speed
+        and lets every column depend only on earlier columns, so each column
+        is one vectorized update. The (2,1) step also pays for the row it
+        skips, so every template frame is charged exactly once.
+        """
+        cost = 1.0 - template @ query.T
+        rows, cols = cost.shape
+        previous2 = np.full(rows, np.inf)
+        previous = np.full(rows, np.inf)
+        previous[0] = cost[0, 0]
+        best, best_end = previous[-1], 0
+        for j in range(1, cols):
+            step = np.full(rows, np.inf)
+            step[0] = 0.0  # free start anywhere in the query
+            step[1:] = np.minimum(previous[:-1], previous2[:-1])
+            step[2:] = np.minimum(step[2:], previous[:-2] + cost[1:-1, j])
+            current = cost[:, j] + step
+            if current[-1] < best:
+                best, best_end = current[-1], j
+            previous2, previous = previous, current
+        return best / rows, best_end
+
+    def detect(self, samples):
+        query = self.features(samples)
+        duration = len(samples) / self.SAMPLE_RATE
+        best, best_end = np.inf, 0
+        for template in self.templates:
+            limit = int(self.search_seconds * 100) + 2 * len(template)
+            distance, end = self._subsequence_dtw(template, query[:limit]) if len(query) >= 2 else (np.inf, 0)
+            if distance < best:
+                best, best_end = distance, end
+        end_time = (best_end * self.HOP + self.FRAME) / self.SAMPLE_RATE
+        detected = bool(best <= self.threshold)
+        # Little audio after the match means the user said only the wake word
+        return WakeResult(detected, float(best), end_time, duration, detected and duration - end_time < 0.4)
+
+    def detect_audio(self, audio):
+        return self.detect(self.audio_samples(audio))
+
+    @classmethod
+    def strip_wake_phrase(cls, command):
+        return cls.WAKE_PREFIX.sub("", command.strip()).strip()
+
+
+def benchmark_wake_word(fixtures_dir, thresholds=(0.15, 0.2, 0.25, 0.3, 0.35, 0.4, 0.45, 0.5, 0.6)):
+    """Report false-accept and false-reject rates of the wake-word gate on WAV fixtures
+
+    fixtures_dir/templates holds enrollment recordings of the wake phrase,
+    fixtures_dir/positive clips that contain it and fixtures_dir/negative
+    clips that do not (other speech, coughs, background noise).
+    fixtures/wake/generate.py builds a reproducible synthetic set.
+    """
+    detector = WakeWordDetector.from_directory(os.path.join(fixtures_dir, 'templates'))
+    if detector is None:
+        print(f"No templates found in {os.path.join(fixtures_dir, 'templates')}")
+        return None
+    clips = {label: [WakeWordDetector.load_wav(path) for path in
+                     sorted(glob.glob(os.path.join(fixtures_dir, label, '*.wav')))]
+             for label in ('positive', 'negative')}
+    distances = {'positive': [], 'negative': []}
+    elapsed = []
+    for label, samples in clips.items():
+        for clip in samples:
+            start = time.perf_counter()
+            distances[label].append(detector.detect(clip).distance)
+            elapsed.append(time.perf_counter() - start)
+    if not elapsed:
+        print("No positive or negative clips found")
+        return None
+
+    print(f"{len(clips['positive'])} positive / {len(clips['negative'])} negative clips, "
+          f"{len(detector.templates)} templates, {sum(elapsed) / len(elapsed) * 1000:.1f} ms per clip")
+    results = []
+    for threshold in sorted(set(thresholds) | {detector.threshold}):
+        false_rejects = sum(d > threshold for d in distances['positive'])
+        false_accepts = sum(d <= threshold for d in distances['negative'])
+        fr_rate = false_rejects / len(distances['positive']) if distances['positive'] else 0.0
+        fa_rate = false_accepts / len(distances['negative']) if distances['negative'] else 0.0
+        results.append((threshold, fa_rate, fr_rate))
+        marker = "  <- configured" if threshold == detector.threshold else ""
+        print(f"threshold {threshold:.2f}: false accept {fa_rate:6.1%} | false reject {fr_rate:6.1%}{marker}")
+    return results
+
+
+def enroll_wake_word(count=5, directory='wake_templates'):
+    """Record the wake phrase a few times from the microphone as detector templates"""
+    os.makedirs(directory, exist_ok=True)
+    recognizer = sr.Recognizer()
+    with sr.Microphone() as source:
+        recognizer.adjust_for_ambient_noise(source, duration=1)
+        for i in range(count):
+            print(f"[{i + 1}/{count}] Say 'Jarvis'...")
+            audio = recognizer.listen(source, timeout=10, phrase_time_limit=3)
+            path = os.path.join(directory, f"jarvis_{int(time.time())}_{i}.wav")
+            with open(path, 'wb') as f:
+                f.write(audio.get_wav_data(convert_rate=WakeWordDetector.SAMPLE_RATE, convert_width=2))
+            print(f"Saved {path}")
+
+
+class VoiceListener:
+    """Microphone front-end that hands recognized speech to a command callback
+
+    A single capture thread owns the microphone for the life of the listener;
+    start/stop and pause/resume only flip flags that thread honours. Capture
+    never waits on recognition: each finished utterance is submitted to a
+    small worker pool and queued, and a delivery thread hands results to
+    on_command strictly in the order they were spoken.
+    """
+
+    def __init__(self, on_command, on_error=None, recalibrate_interval=60, tracer=None,
+                 wake_word=None, wake_window=8, stt=None, recognition_workers=None, microphone=None):
+        self.on_command = on_command
+        self.tracer = tracer
+        self.on_error = on_error or (lambda message: None)
+        self.recalibrate_interval = recalibrate_interval
+        self.active = False
+        self.paused = False
+        self.running = True
+        self.last_calibration = 0
+        # Optional offline gate: phrases go to cloud recognition only after the wake word
+        self.wake_word = wake_word
+        self.wake_window = wake_window
+        self.armed_until = 0
+        self.wake_stats = {'accepted': 0, 'rejected': 0}
+        self.vad = None
+        self._segments = deque()
+        self._wake = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._results = queue.Queue()
+        self._pool = None
+        self._delivery = None
+        self.recognition_workers = recognition_workers or int(os.getenv('JARVIS_STT_WORKERS', '2'))
+
+        # Initialize voice recognition with error handling
+        try:
+            self.stt = stt or create_speech_to_text()
+            self.microphone = microphone or sr.Microphone()
+        except Exception as e:
+            logging.error(f"Microphone initialization failed: {e}")
+            self.microphone = None
+
+    @property
+    def available(self):
+        return self.microphone is not None
+
+    @property
+    def listening(self):
+        return self.active and not self.paused
+
+    def start(self):
+        """Begin listening, starting the capture thread the first time"""
+        with self._thread_lock:
+            self.active = True
+            if self._thread is None or not self._thread.is_alive():
+                if self._pool is None:
+                    # Order-sensitive recognizers (replayed transcripts) get a single worker
+                    workers = self.recognition_workers if getattr(self.stt, 'concurrent', True) else 1
+                    self._pool = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=workers, thread_name_prefix="stt")
+                    self._delivery = threading.Thread(target=self.deliver_results, daemon=True)
+                    self._delivery.start()
+                self._thread = threading.Thread(target=self.voice_listener, daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def stop(self):
+        """Stop acting on speech; the capture thread stays alive"""
+        self.active = False
+
+    def pause(self):
+        """Ignore the microphone while JARVIS is talking"""
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+        self._wake.set()
+
+    def close(self):
+        """Release the microphone and end the capture thread"""
+        self.running = False
+        self.active = False
+        self._wake.set()
+        self._results.put(None)
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def calibrate(self, source, duration=1):
+        """Seed the VAD noise floor from the current ambient noise"""
+        chunks = int(duration * source.SAMPLE_RATE / source.CHUNK) + 1
+        self.vad.calibrate(b"".join(source.stream.read(source.CHUNK) for _ in range(chunks)))
+        self.last_calibration = time.time()
+        logging.info(f"Microphone calibrated (noise floor {10 * np.log10(self.vad.noise):.0f} dBFS)")
+
+    def next_segment(self, source):
+        """Read the microphone until the VAD completes an utterance; None if listening stops"""
+        while self.running and self.listening:
+            if self._segments:
+                return self._segments.popleft()
+            self._segments.extend(self.vad.feed(source.stream.read(source.CHUNK)))
+        # Whatever was being said overlapped with JARVIS talking; start clean next time
+        self._segments.clear()
+        self.vad.reset()
+        return None
+
+    def calibration_due(self):
+        return time.time() - self.last_calibration >= self.recalibrate_interval
+
+    def idle(self):
+        """True when every captured utterance has been delivered or dropped"""
+        return self._results.unfinished_tasks == 0 and not self._segments
+
+    def recognize_segment(self, segment, audio, armed):
+        """Worker: gate and transcribe one utterance; text is None if it never reached STT"""
+        wake, wake_span = None, None
+        if self.wake_word and not armed:
+            wake_start = time.perf_counter()
+            wake = self.wake_word.detect_audio(audio)
+            wake_span = (wake_start, time.perf_counter())
+            if not wake.detected or wake.wake_only:
+                return Recognition(segment, wake, wake_span, None, None, None)
+        stt_start = time.perf_counter()
+        try:
+            text, backend = self.stt.transcribe(audio)
+        except sr.UnknownValueError:
+            text, backend = "", None
+        return Recognition(segment, wake, wake_span, text, backend, (stt_start, time.perf_counter()))
+
+    def deliver_results(self):
+        """Delivery loop: resolve recognitions in capture order and act on them"""
+        while True:
+            future = self._results.get()
+            if future is None:
+                return
+            try:
+                result = future.result()
+                if result.wake and not result.wake.detected and time.time() <= self.armed_until:
+                    # An earlier phrase was just the wake word, armed after this one was captured
+                    result = self.recognize_segment(result.segment, self._audio(result.segment), True)
+                if self.active:
+                    self.handle_recognition(result)
+            except concurrent.futures.CancelledError:
+                return
+            except sr.RequestError as e:
+                logging.error(f"Voice recognition service error: {e}")
+                self.active = False
+                self.on_error(f"Voice recognition error: {e}")
+            except Exception as e:
+                logging.error(f"Voice recognition error: {e}")
+            finally:
+                self._results.task_done()
+
+    @staticmethod
+    def _audio(segment):
+        return sr.AudioData(segment.pcm, segment.sample_rate, segment.sample_width)
+
+    def handle_recognition(self, result):
+        """Apply the wake gate outcome and pass the command on with its trace"""
+        if result.wake:
+            if not result.wake.detected:
+                self.wake_stats['rejected'] += 1
+                logging.info(f"No wake word (distance {result.wake.distance:.2f}); phrase dropped locally")
+                return
+            self.wake_stats['accepted'] += 1
+            if result.wake.wake_only:
+                self.armed_until = time.time() + self.wake_window
+                logging.info("Wake word heard; listening for a command")
+                return
+        self.armed_until = 0
+
+        if not result.text:
+            logging.info("No speech detected")
+            return
+        logging.info(f"Recognized command ({result.backend.name}): {result.text}")
+        command = WakeWordDetector.strip_wake_phrase(result.text)
+        if not command:
+            # Only the wake word was said; take the next phrase as the command
+            self.armed_until = time.time() + self.wake_window
+            return
+        trace = None
+        if self.tracer:
+            segment = result.segment
+            # The user finished speaking at the last speech frame
+            trace = self.tracer.start("voice", origin=segment.speech_end)
+            trace.add_span("capture", segment.speech_start, segment.speech_end)
+            trace.add_span("vad", segment.speech_end, segment.emitted)
+            if result.wake_span:
+                trace.add_span("wake", *result.wake_span)
+            trace.add_span("stt", *result.stt_span, backend=result.backend.name)
+            # Time spent waiting behind earlier utterances still being recognized
+            trace.add_span("order", result.stt_span[1], time.perf_counter())
+        self.on_command(command, trace)
+
+    def voice_listener(self):
+        """Capture loop that owns the microphone until the listener is closed"""
+        try:
+            # Test microphone availability
+            if self.microphone is None:
+                self.active = False
+                self.on_error("Microphone not available")
+                return
+
+            # Holding the source open for the whole loop makes this thread its only user
+            with self.microphone as source:
+                self.vad = VoiceActivityDetector(sample_rate=source.SAMPLE_RATE, sample_width=source.SAMPLE_WIDTH)
+                # Never take the noise floor while JARVIS is talking
+                while self.paused and self.running:
+                    self._wake.wait(0.5)
+                    self._wake.clear()
+                self.calibrate(source)
+
+                while self.running:
+                    if not self.listening:
+                        # Keep the noise calibration fresh while stopped, but not while
+                        # paused: that is when speech output is playing
+                        if not self.active and not self.paused and self.calibration_due():
+                            self.calibrate(source, duration=0.5)
+                        self._wake.wait(0.5)
+                        self._wake.clear()
+                        continue
+
+                    try:
+                        logging.info("Listening for voice command...")
+                        segment = self.next_segment(source)
+                        if segment is None:
+                            continue
+                        audio = self._audio(segment)
+                    except Exception as e:
+                        logging.error(f"Error during listening: {e}")
+                        self.active = False
+                        self.on_error("Voice recognition error. Switching to manual mode.")
+                        continue
+
+                    # Drop audio that overlapped with JARVIS starting to talk
+                    if not self.listening:
+                        continue
+
+                    # Hand off and go straight back to the microphone
+                    armed = time.time() <= self.armed_until
+                    self._results.put(self._pool.submit(self.recognize_segment, segment, audio, armed))
+
+        except Exception as e:
+            logging.critical(f"Voice listener error: {e}")
+            self.active = False
+            self.on_error("Voice system error. Please check your microphone.")
+
+
+class WavMicrophone:
+    """Stands in for sr.Microphone, playing WAV files into the capture loop
+
+    Clips are converted to 16 kHz mono, separated by gap seconds of silence
+    and delivered in real time so VAD and latency figures match a live
+    microphone. finished is set once the capture loop reads past the end.
+    """
+
+    SAMPLE_RATE = WakeWordDetector.SAMPLE_RATE
+    SAMPLE_WIDTH = 2
+    CHUNK = 1024
+
+    def __init__(self, paths, gap=1.0, lead_in=1.5):
+        self.clips = []
+        silence = lambda seconds: b"\0" * (int(seconds * self.SAMPLE_RATE) * self.SAMPLE_WIDTH)
+        parts = [silence(lead_in)]
+        position = lead_in
+        for path in paths:
+            pcm = WakeWordDetector.load_pcm(path)
+            duration = len(pcm) / (self.SAMPLE_RATE * self.SAMPLE_WIDTH)
+            self.clips.append((path, position, position + duration))
+            parts += [pcm, silence(gap)]
+            position += duration + gap
+        # Enough trailing silence for the VAD to close the last utterance
+        parts.append(silence(2.0))
+        self.data = b"".join(parts)
+        self.offset = 0
+        self.started = None
+        self.finished = threading.Event()
+        self.stream = self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def read(self, frames):
+        if self.started is None:
+            self.started = time.perf_counter()
+        size = frames * self.SAMPLE_WIDTH
+        chunk = self.data[self.offset:self.offset + size]
+        self.offset += size
+        if len(chunk) < size:
+            self.finished.set()
+            chunk += b"\0" * (size - len(chunk))
+        due = self.started + self.offset / (self.SAMPLE_RATE * self.SAMPLE_WIDTH)
+        time.sleep(max(0.0, due - time.perf_counter()))
+        return chunk
+
+    def clip_at(self, moment):
+        """Path of the clip playing at a perf_counter moment, if any"""
+        position = moment - self.started
+        for path, start, end in self.clips:
+            if start - 0.5 <= position <= end + 0.5:
+                return path
+        return None
+
+
+def replay_voice_pipeline(path, backend=None, stt=None, report=None, gap=1.0):
+    """Play WAV files through capture, recognition and routing with speech muted
+
+    path is a WAV file or a directory of them; a .txt beside a WAV holds the
+    expected transcript. Prints recognition results and latency from the end
+    of speech to the reply being handed to TTS, and writes them as JSON to
+    report if given.
+    """
+    import tempfile
+    paths = sorted(glob.glob(os.path.join(path, '*.wav'))) if os.path.isdir(path) else [path]
+    if not paths:
+        print(f"No WAV files found in {path}")
+        return None
+
+    workdir = tempfile.mkdtemp(prefix="jarvis_replay_")
+    core = JarvisEngine(memory_file=os.path.join(workdir, 'memory.json'),
+                        cache_file=os.path.join(workdir, 'cache.json'), trace_file=None,
+                        backend=backend)
+    core.start_ai_probe()
+    replies = []
+    core.attach_display(lambda speaker, message, tag=None:
+                        replies.append(message) if speaker.upper() == "JARVIS" else None)
+
+    def null_speech(text, on_start=None, on_done=None):
+        if on_start:
+            on_start()
+        if on_done:
+            on_done(True)
+
+    core.attach_speech(null_speech)
+
+    microphone = WavMicrophone(paths, gap=gap)
+    commands = queue.Queue()
+    listener = VoiceListener(
+        on_command=lambda command, trace: commands.put((command, trace)),
+        on_error=lambda message: logging.error(f"Replay: {message}"),
+        tracer=core.tracer,
+        wake_word=WakeWordDetector.from_directory(os.getenv('JARVIS_WAKE_TEMPLATES', 'wake_templates')),
+        stt=stt or create_speech_to_text('replay', path),
+        microphone=microphone
+    )
+    listener.start()
+
+    results = []
+    while True:
+        try:
+            command, trace = commands.get(timeout=0.1)
+        except queue.Empty:
+            if microphone.finished.is_set() and listener.idle():
+                break
+            continue
+        del replies[:]
+        core.process_voice_command(command, trace)
+        stages = trace.stage_durations()
+        results.append({
+            'file': microphone.clip_at(trace.origin),
+            'heard': command,
+            'intent': trace.intent,
+            'reply': " ".join(replies),
+            'stt_ms': round(stages.get('stt', 0) * 1000, 1),
+            'first_audio_ms': round(trace.first_audio * 1000, 1) if trace.first_audio is not None else None,
+            'end_to_end_ms': round((time.perf_counter() - trace.origin) * 1000, 1)
+        })
+    listener.close()
+    core.request_exit(0)
+
+    rows = []
+    for clip_path, _, _ in microphone.clips:
+        expected = None
+        txt_path = os.path.splitext(clip_path)[0] + '.txt'
+        if os.path.exists(txt_path):
+            with open(txt_path) as f:
+                expected = WakeWordDetector.strip_wake_phrase(f.read().strip().lower())
+        heard = [r for r in results if r['file'] == clip_path] or [{'file': clip_path, 'heard': None}]
+        for result in heard:
+            result['expected'] = expected
+            result['match'] = None if expected is None else result['heard'] == expected
+            rows.append(result)
+
+    for row in rows:
+        verdict = {True: "ok", False: "MISMATCH", None: "--"}[row['match']]
+        if row['heard'] is None:
+            print(f"{os.path.basename(row['file'])}: [{verdict}] nothing recognized")
+            continue
+        print(f"{os.path.basename(row['file'])}: [{verdict}] heard {row['heard']!r} -> "
+              f"{row['intent']} in {row['end_to_end_ms']:.0f} ms")
+    latencies = sorted(row['end_to_end_ms'] for row in rows if row['heard'])
+    checked = [row for row in rows if row['match'] is not None]
+    summary = {
+        'clips': len(microphone.clips),
+        'recognized': len(latencies),
+        'matched': sum(row['match'] for row in checked),
+        'checked': len(checked),
+        'p50_ms': latencies[len(latencies) // 2] if latencies else None,
+        'p95_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None
+    }
+    print(f"{summary['recognized']}/{summary['clips']} clips recognized, "
+          f"{summary['matched']}/{summary['checked']} transcripts match, "
+          f"end-to-end p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms")
+    if report:
+        with open(report, 'w') as f:
+            json.dump({'path': path, 'summary': summary, 'utterances': rows}, f, indent=2)
+    shutil.rmtree(workdir, ignore_errors=True)
+    return summary
+
+
+class JARVIS:
+    """Tk desktop front-end with voice input and spoken replies"""
+
+    def __init__(self, root, core=None, fast_boot=False, stt=None):
+        try:
+            self.root = root
+            self.core = core or JarvisEngine()
+            self.fast_boot = fast_boot
+            self.command_queue = queue.Queue()
+            self.is_speaking = False
+            self.streaming_reply = False
+            self.current_theme = 'dark'
+
+            self.listener = VoiceListener(
+                on_command=lambda command, trace: self.command_queue.put((command, trace)),
+                tracer=self.core.tracer,
+                on_error=lambda message: self.root.after(0, lambda: self.on_voice_error(message)),
+                wake_word=WakeWordDetector.from_directory(os.getenv('JARVIS_WAKE_TEMPLATES', 'wake_templates')),
+                stt=stt
+            )
+            if not self.listener.available:
+                messagebox.showwarning("Microphone Error", 
+                                    "Could not initialize microphone. Voice control will be disabled.")
+
+            # Initialize components
+            self.configure_window()
+            self.create_gui()
+            self.voice_output = VoiceOutput(
+                self.core.system_os,
+                on_busy_change=lambda busy: self.root.after(0, lambda: self.on_speech_state(busy))
+            )
+            if self.voice_output.engine:
+                self.core.attach_speech(self.speak)
+            self.core.attach_display(self.on_tk_thread(self.update_chat),
+                                     stream=self.on_tk_thread(self.stream_chat))
+            self.core.on_exit(self.shutdown)
+            self.core.on_status(self.on_tk_thread(self.on_ai_status))
+            self.core.metrics.on_sample(self.on_tk_thread(lambda sample: self.update_status_bar()))
+            self.core.register_probe("TTS", self.probe_tts, timeout=1)
+            self.core.register_probe("Microphone", self.probe_microphone, timeout=1)
+            self.core.register_probe("Speech Recognition", self.probe_stt, timeout=1)
+            threading.Thread(target=self.command_worker, daemon=True).start()
+            self.core.start_ai_probe()
+            self.boot_sequence()
+            
+        except Exception as e:
+            messagebox.showerror("Initialization Error", f"Failed to initialize JARVIS:\n{str(e)}")
+            traceback.print_exc()
+            self.root.destroy()
+
+    @property
+    def voice_active(self):
+        return self.listener.active
+
+    def configure_window(self):
+        """Configure main window appearance with modern UI"""
+        self.root.title("J.A.R.V.I.S. - Just A Rather Very Intelligent System")
+        self.root.geometry("1000x700")
+        self.root.minsize(800, 600)
+        self.root.configure(bg='#0a0a0a')
+        
+        # Modern styling
+        self.style = ttk.Style()
+        self.style.theme_use('clam')
+        self.style.configure('TFrame', background='#0a0a0a')
+        self.style.configure('TLabel', background='#0a0a0a', foreground='#ff6600')
+        self.style.configure('TButton', background='#ff6600', foreground='black')
+        self.style.map('TButton', 
+                      background=[('active', '#ff8533'), ('pressed', '#cc5200')])
+
+    def create_gui(self):
+        """Create modern interface components"""
+        # Main frame
+        main_frame = ttk.Frame(self.root)
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        # Chat display with modern styling
+        self.chat_area = scrolledtext.ScrolledText(
+            main_frame,
+            wrap=tk.WORD,
+            state='disabled',
+            font=('Consolas', 12),
+            bg='#1a1a1a',
+            fg='#ff6600',
+            insertbackground='white',
+            borderwidth=0,
+            highlightthickness=0,
+            padx=20,
+            pady=20
+        )
+        self.chat_area.pack(fill=tk.BOTH, expand=True)
+        
+        # Configure tags for different message types
+        self.chat_area.tag_config('user', foreground='#00ff00')
+        self.chat_area.tag_config('system', foreground='#ffffff')
+        self.chat_area.tag_config('warning', foreground='#ffff00')
+        self.chat_area.tag_config('error', foreground='#ff0000')
+        self.chat_area.tag_config('jarvis', foreground='#ff6600')
+
+        # Status bar
+        self.status_bar = ttk.Label(
+            main_frame,
+            text=f"System: Ready | OS: {platform.system()} | AI: {self.core.ai_status} | Voice: Off",
+            relief=tk.SUNKEN,
+            anchor=tk.W
+        )
+        self.status_bar.pack(fill=tk.X, pady=(0, 5))
+
+        # Input frame with modern controls
+        input_frame = ttk.Frame(main_frame)
+        input_frame.pack(fill=tk.X, padx=20, pady=(0, 20))
+        
+        # Voice control button
+        self.voice_btn = ttk.Button(
+            input_frame,
+            text="🎤",
+            command=self.toggle_voice_control,
+            width=3
+        )
+        self.voice_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.user_input = ttk.Entry(
+            input_frame,
+            font=('Helvetica', 12)
+        )
+        self.user_input.pack(side=tk.LEFT, fill=tk.X, expand=True, ipady=5)
+        self.user_input.bind('<Return>', self.process_input)
+        
+        ttk.Button(
+            input_frame,
+            text="SEND",
+            command=self.process_input,
+            style='Accent.TButton'
+        ).pack(side=tk.RIGHT, padx=(10, 0))
+
+    def boot_sequence(self):
+        """Run startup sequence"""
+        messages = [
+            "Initializing J.A.R.V.I.S. protocols...",
+            f"Detected OS: {platform.system()} {platform.release()}",
+            "Loading system modules...",
+            "Initializing voice synthesis...",
+            f"Connecting to {self.core.backend.name} AI...",
+            "Establishing secure connection...",
+            "Systems nominal. JARVIS online."
+        ]
+        
+        # The first callback runs once mainloop() is live and input is accepted
+        self.root.after(0, self.mark_input_ready)
+        if self.fast_boot:
+            self.root.after(0, self.greet)
+            return
+
+        # Schedule messages through the event loop so the window stays live
+        for i, msg in enumerate(messages):
+            self.root.after(i * 500, lambda msg=msg: self.update_chat("SYSTEM", msg, 'system'))
+        self.root.after(len(messages) * 500, self.greet)
+
+    def mark_input_ready(self):
+        """Focus the input box and record how long startup took"""
+        self.user_input.focus_set()
+        startup_ms = (time.perf_counter() - PROCESS_START) * 1000
+        logging.info(f"Startup time: {startup_ms:.0f} ms (process start to input accepted)")
+
+    def greet(self):
+        self.core.jarvis_speak(random.choice(self.core.responses["greeting"]))
+
+    def on_ai_status(self):
+        """Reflect the result of the background AI probe"""
+        self.update_status_bar()
+        if self.core.ai_status == "Offline":
+            self.core.jarvis_speak("Warning: AI systems offline. Running in limited capacity.")
+
+    def update_chat(self, speaker, message, tag=None):
+        """Update the chat display with timestamp"""
+        self.chat_area.configure(state='normal')
+        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
+        self.chat_area.insert(tk.END, f"[{timestamp}] {speaker.upper()}: {message}\n\n", tag or speaker.lower())
+        self.chat_area.configure(state='disabled')
+        self.chat_area.see(tk.END)
+
+    def stream_chat(self, speaker, chunk, done):
+        """Append a reply to the chat display as it is generated"""
+        self.chat_area.configure(state='normal')
+        if not self.streaming_reply:
+            timestamp = datetime.datetime.now().strftime("%H:%M:%S")
+            self.chat_area.insert(tk.END, f"[{timestamp}] {speaker.upper()}: ", speaker.lower())
+            self.streaming_reply = True
+        self.chat_area.insert(tk.END, chunk, speaker.lower())
+        if done:
+            self.chat_area.insert(tk.END, "\n\n", speaker.lower())
+            self.streaming_reply = False
+        self.chat_area.configure(state='disabled')
+        self.chat_area.see(tk.END)
+
+    def on_tk_thread(self, func):
+        """Wrap a GUI callback so it always runs on the Tk main thread"""
+        def wrapper(*args):
+            if threading.current_thread() is threading.main_thread():
+                func(*args)
+            else:
+                self.root.after(0, lambda: func(*args))
+        return wrapper
+
+    def command_worker(self):
+        """Process queued commands in order, off the Tk thread"""
+        while self.core.running:
+            item = self.command_queue.get()
+            if item is None:
+                break
+            command, trace = item
+            try:
+                self.core.process_voice_command(command, trace)
+            except Exception as e:
+                logging.error(f"Command processing error: {e}")
+                self.core.update_chat("SYSTEM", f"Command failed: {e}", 'error')
+
+    def speak(self, text, on_start=None, on_done=None):
+        """Speech sink for the engine; returns immediately while the worker talks"""
+        self.voice_output.speak(text, on_start=on_start, on_done=on_done)
+
+    def on_speech_state(self, busy):
+        """Mute voice recognition while JARVIS is talking"""
+        if busy:
+            self.is_speaking = True
+            self.listener.pause()
+        else:
+            self.is_speaking = False
+            # Brief pause before reactivating
+            self.root.after(500, self.resume_listening)
+        self.update_status_bar()
+
+    def resume_listening(self):
+        if not self.is_speaking:
+            self.listener.resume()
+
+    def shutdown(self, delay_ms=1000):
+        """Tear down the window once the farewell has had time to play"""
+        self.listener.close()
+        self.root.after(delay_ms, self._close)
+
+    def _close(self):
+        self.command_queue.put(None)
+        self.voice_output.shutdown()
+        self.root.destroy()
+
+    def probe_tts(self, timeout):
+        if not self.voice_output.engine:
+            return False, "TTS engine failed to initialize"
+        state = "speaking" if self.voice_output.busy else "idle"
+        return True, f"Engine {state}, {self.voice_output.pending.qsize()} utterances queued"
+
+    def probe_microphone(self, timeout):
+        if not self.listener.available:
+            return False, "No microphone detected"
+        state = "paused" if self.listener.paused else "listening" if self.listener.active else "standby"
+        if self.listener.vad:
+            state += f", {self.listener.vad.summary()}"
+        if not self.listener.wake_word:
+            return True, f"Capture {state}, no wake word gate"
+        stats = self.listener.wake_stats
+        return True, (f"Capture {state}, wake word gate passed {stats['accepted']} / "
+                      f"dropped {stats['rejected']} phrases locally")
+
+    def probe_stt(self, timeout):
+        if not self.listener.available:
+            return False, "No microphone detected"
+        if not self.listener.stt.backends:
+            return False, "No speech recognition backend available"
+        return True, " | ".join(self.listener.stt.summary())
+
+    def on_voice_error(self, message):
+        """Report a voice listener failure on the GUI thread"""
+        self.update_status_bar()
+        self.core.jarvis_speak(message)
+
+    def update_status_bar(self):
+        """Update the status bar with current system status"""
+        ai_status = self.core.ai_status
+        if self.core.breaker.state != CircuitBreaker.CLOSED:
+            ai_status += f" ({self.core.breaker.describe()})"
+        voice_status = "On (muted)" if self.is_speaking else "On" if self.voice_active else "Off"
+        sample = self.core.metrics.latest()
+        load = f"CPU: {sample.cpu}% | RAM: {sample.ram}%" if sample else "CPU: --% | RAM: --%"
+        self.status_bar.config(
+            text=f"System: Ready | OS: {platform.system()} | AI: {ai_status} | Voice: {voice_status} | {load}"
+        )
+
+    def toggle_voice_control(self):
+        """Toggle voice recognition on/off"""
+        if not self.listener.available:
+            self.core.jarvis_speak("Voice recognition not available")
+            return
+            
+        if not self.listener.active:
+            message = "Voice recognition activated. Say 'Jarvis' or 'Hey Jarvis' to get my attention."
+            self.core.update_chat("JARVIS", message)
+            if self.voice_output.engine:
+                # Start (and calibrate) only once the announcement is over, not on JARVIS's own voice
+                self.voice_output.speak(message, on_done=lambda completed: self.root.after(0, self.start_listening))
+            else:
+                self.start_listening()
+        else:
+            self.listener.stop()
+            self.update_status_bar()
+            self.core.jarvis_speak("Voice recognition deactivated.")
+
+    def start_listening(self):
+        self.listener.start()
+        self.update_status_bar()
+
+    def process_input(self, event=None):
+        """Handle text input"""
+        command = self.user_input.get().strip()
+        if not command:
+            return
+            
+        self.update_chat("YOU", command, 'user')
+        self.user_input.delete(0, tk.END)
+        
+        if command.lower() in ["exit", "quit"]:
+            self.core.jarvis_speak(random.choice(self.core.responses["farewell"]))
+            self.core.request_exit(1000)
+            return
+            
+        self.command_queue.put((command.lower(), self.core.tracer.start("text")))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="J.A.R.V.I.S. desktop assistant")
+    parser.add_argument("--bench-router", action="store_true",
+                        help="benchmark intent dispatch latency and exit")
+    parser.add_argument("--bench-memory", action="store_true",
+                        help="benchmark memory journal mutations against full rewrites and exit")
+    parser.add_argument("--bench-http", action="store_true",
+                        help="benchmark pooled HTTP requests against fresh connections and exit")
+    parser.add_argument("--bench-ollama", action="store_true",
+                        help="benchmark Ollama keep-alive, warm-up and context reuse on a stand-in server and exit")
+    parser.add_argument("--check-ollama-priming", action="store_true",
+                        help="compare replies from a real Ollama model with and without the primed persona and exit")
+    parser.add_argument("--bench-wake", metavar="DIR",
+                        help="report wake-word false accept/reject rates on WAV fixtures in DIR and exit")
+    parser.add_argument("--replay-voice", metavar="PATH",
+                        help="play a WAV file or directory through the voice pipeline with TTS muted, "
+                             "report recognition and latency, and exit")
+    parser.add_argument("--replay-report", metavar="FILE",
+                        help="write --replay-voice results to FILE as JSON")
+    parser.add_argument("--enroll-wake", type=int, metavar="N",
+                        help="record N samples of the wake word into wake_templates/ and exit")
+    parser.add_argument("--headless", action="store_true",
+                        help="run without GUI, microphone or TTS, reading commands from stdin")
+    parser.add_argument("--fast-boot", action="store_true",
+                        help="skip the boot message sequence")
+    parser.add_argument("--backend", choices=sorted(LLM_BACKENDS),
+                        default=os.getenv('JARVIS_LLM_BACKEND', 'gemini'),
+                        help="AI backend to use (default: gemini, or $JARVIS_LLM_BACKEND)")
+    parser.add_argument("--context-budget", type=int, default=1024,
+                        help="approximate token budget for each AI prompt including conversation context")
+    parser.add_argument("--stt", choices=["google", "local", "replay"],
+                        default=os.getenv('JARVIS_STT_BACKEND', 'google'),
+                        help="speech recognition backend; google falls back to the local engine when offline")
+    parser.add_argument("--stt-replay", metavar="PATH",
+                        help="transcript file or WAV+TXT directory for --stt replay")
+    parser.add_argument("--no-stream", action="store_true",
+                        help="wait for complete AI responses instead of streaming them")
+    args = parser.parse_args()
+
+    if args.bench_router:
+        benchmark_intent_router()
+        sys.exit(0)
+
+    if args.bench_memory:
+        benchmark_memory_journal()
+        sys.exit(0)
+
+    if args.bench_http:
+        benchmark_http_pool()
+        sys.exit(0)
+
+    if args.bench_ollama:
+        benchmark_ollama_warm_start()
+        sys.exit(0)
+
+    if args.check_ollama_priming:
+        compare_ollama_priming()
+        sys.exit(0)
+
+    if args.bench_wake:
+        benchmark_wake_word(args.bench_wake)
+        sys.exit(0)
+
+    if args.replay_voice:
+        # Replayed transcripts default to the .txt files beside the WAVs
+        stt = create_speech_to_text(args.stt, args.stt_replay or args.replay_voice)
+        replay_voice_pipeline(args.replay_voice, backend=args.backend, stt=stt, report=args.replay_report)
+        sys.exit(0)
+
+    if args.enroll_wake:
+        enroll_wake_word(args.enroll_wake, os.getenv('JARVIS_WAKE_TEMPLATES', 'wake_templates'))
+        sys.exit(0)
+
+    if args.headless:
+        core = JarvisEngine(streaming=not args.no_stream, backend=args.backend,
+                            context_budget=args.context_budget)
+        core.start_ai_probe()
+        streaming_speaker = []
+
+        def print_stream(speaker, chunk, done):
+            if not streaming_speaker:
+                print(f"{speaker.upper()}: ", end="")
+                streaming_speaker.append(speaker)
+            print(chunk, end="\n" if done else "", flush=True)
+            if done:
+                streaming_speaker.clear()
+
+        core.attach_display(lambda speaker, message, tag=None: print(f"{speaker.upper()}: {message}"),
+                            stream=print_stream)
+        for line in sys.stdin:
+            if line.strip():
+                core.process_voice_command(line.strip().lower())
+            if not core.running:
+                break
+        sys.exit(0)
+
+    try:
+        root = tk.Tk()
+        app = JARVIS(root, JarvisEngine(streaming=not args.no_stream, backend=args.backend,
+                                        context_budget=args.context_budget),
+                     fast_boot=args.fast_boot, stt=create_speech_to_text(args.stt, args.stt_replay))
+        root.mainloop()
+    except Exception as e:
+        logging.critical(f"Fatal error: {e}")
+        messagebox.showerror("JARVIS Error", f"A critical error occurred: {str(e)}")